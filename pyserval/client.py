@@ -6,7 +6,8 @@ This module provides a high-level way to interact with serval
 """
 
 from pyserval.lowlevel.client import LowLevelClient
-from pyserval.connection import CheckedConnection
+from pyserval.connection import CheckedConnection, ClosableInterface
+from pyserval.lowlevel.connection import POOL_MAXSIZE
 from pyserval.keyring import Keyring
 from pyserval.rhizome import Rhizome
 from pyserval.meshms import MeshMS
@@ -14,16 +15,19 @@ from pyserval.meshmb import MeshMB
 from pyserval.route import Route
 
 
-class Client:
+class Client(ClosableInterface):
     """Meta-Class to access package functionality
 
         Allows for the automatic initialisation of all API-objects at once.
+        All of them share a single connection-object, and thereby its pool of kept-alive connections
+        Can be used as a context-manager (see ClosableInterface)
 
         Args:
             host (str): Hostname to connect to
             port (int): Port to connect to
             user (str): Username for HTTP basic auth
             passwd (str): Password for HTTP basic auth
+            pool_maxsize (int): Maximum number of kept-alive connections, see RestfulConnection
 
         Attributes:
             keyring (Keyring): Provides access to the 'Keyring'-API, see
@@ -44,11 +48,13 @@ class Client:
         port: int = 4110,
         user: str = "pyserval",
         passwd: str = "pyserval",
+        pool_maxsize: int = POOL_MAXSIZE,
     ) -> None:
         self._connection = CheckedConnection(
-            host=host, port=port, user=user, passwd=passwd
+            host=host, port=port, user=user, passwd=passwd, pool_maxsize=pool_maxsize
         )
         self._low_level_client = LowLevelClient(self._connection)
+        ClosableInterface.__init__(self, self._low_level_client)
         self.keyring = Keyring(self._low_level_client.keyring)
         self.rhizome = Rhizome(self._low_level_client.rhizome, self.keyring)
         self.meshms = MeshMS(self._low_level_client.meshms)
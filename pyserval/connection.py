@@ -3,11 +3,37 @@ pyserval.connection
 ~~~~~~~~~~~~~~~~~~~
 """
 
-from pyserval.lowlevel.connection import RestfulConnection
+from pyserval.lowlevel.connection import RestfulConnection, POOL_MAXSIZE
 from pyserval.exceptions import UnauthorizedError
-from typing import Any
+from typing import Any, TypeVar
 from requests.models import Response
 
+T = TypeVar("T", bound="ClosableInterface")
+
+
+class ClosableInterface:
+    """Base for the high level interfaces, which send their requests over the kept-alive
+    connections of the underlying RestfulConnection
+
+    Can be used as a context-manager, which closes these connections on exit
+
+    Args:
+        low_level (Any): Low level interface (or client), whose 'close' closes the connections
+    """
+
+    def __init__(self, low_level: Any) -> None:
+        self._closable = low_level
+
+    def __enter__(self: T) -> T:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes the connections to the serval-server which are kept alive"""
+        self._closable.close()
+
 
 class CheckedConnection(RestfulConnection):
     """Encapsulates HTTP-calls and throws exceptions for common error-cases
@@ -17,6 +43,7 @@ class CheckedConnection(RestfulConnection):
         port (int): Port to connect to
         user (str): Username for HTTP basic auth
         passwd (str): Password for HTTP basic auth
+        pool_maxsize (int): Maximum number of kept-alive connections, see RestfulConnection
     """
 
     def __init__(
@@ -25,8 +52,9 @@ class CheckedConnection(RestfulConnection):
         port: int = 4110,
         user: str = "pyserval",
         passwd: str = "pyserval",
+        pool_maxsize: int = POOL_MAXSIZE,
     ) -> None:
-        RestfulConnection.__init__(self, host, port, user, passwd)
+        RestfulConnection.__init__(self, host, port, user, passwd, pool_maxsize)
 
     def get(self, path: str, **params: Any) -> Response:
         """Sends GET-request to REST-API
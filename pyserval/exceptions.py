@@ -5,7 +5,9 @@ pyserval.exceptions
 Collected exceptions
 """
 
+from pyserval.lowlevel.util import decode_json
 from requests.models import Response
+from typing import Dict
 
 
 class MalformedRequestError(Exception):
@@ -111,12 +113,27 @@ class RhizomeHTTPStatusError(Exception):
         assert isinstance(serval_response, Response)
 
         self.http_status: int = serval_response.status_code
-        self.response: str = serval_response.json()
+        self.response: str = decode_json(serval_response)
 
     def __str__(self) -> str:
         return f"Unknown HTTP status code {self.http_status}, hint: {self.response}"
 
 
+class FeedBatchError(Exception):
+    """Raised if following/unfollowing some of multiple feeds failed
+
+    Args:
+        errors (Dict[str, RhizomeHTTPStatusError]): The errors, keyed by the Feed ID they occurred for
+    """
+
+    def __init__(self, errors: Dict[str, RhizomeHTTPStatusError]) -> None:
+        assert isinstance(errors, dict)
+        self.errors = errors
+
+    def __str__(self) -> str:
+        return f"Failed for {len(self.errors)} feed(s): {', '.join(self.errors)}"
+
+
 class UnknownRhizomeStatusError(Exception):
     """Raised for rhizome responses with an unknown combination of HTTP/Bundle/Payload status
 
@@ -257,6 +274,13 @@ class ConversationNotFoundError(Exception):
         return f"No conversation between {self.sid} and {self.other_sid}"
 
 
+class ConnectionClosedError(Exception):
+    """Raised if trying to run concurrent requests over a closed connection-object"""
+
+    def __str__(self) -> str:
+        return "Connection has been closed, no further concurrent requests can be run"
+
+
 class UnauthorizedError(Exception):
     """Raised if username/password is wrong"""
 
@@ -7,7 +7,7 @@ High level API for accessing the serval keyring
 
 from pyserval.exceptions import IdentityNotFoundError, MalformedRequestError
 from pyserval.lowlevel.keyring import LowLevelKeyring
-from pyserval.lowlevel.util import unmarshall
+from pyserval.lowlevel.util import decode_json, unmarshall
 from typing import Any, List
 
 
@@ -158,7 +158,7 @@ class Keyring:
         if serval_reply.status_code == 400:
             raise MalformedRequestError()
 
-        reply_json = serval_reply.json()
+        reply_json = decode_json(serval_reply)
         return ServalIdentity(self, **reply_json["identity"])
 
     def get_identities(self, pin: str = "") -> List[ServalIdentity]:
@@ -171,7 +171,7 @@ class Keyring:
             List[ServalIdentity]: All currently unlocked identities
         """
         serval_response = self.low_level_keyring.get_identities(pin=pin)
-        response_json = serval_response.json()
+        response_json = decode_json(serval_response)
 
         identities = unmarshall(
             json_table=response_json, object_class=ServalIdentity, _keyring=self
@@ -199,7 +199,7 @@ class Keyring:
         if serval_response.status_code == 404:
             raise IdentityNotFoundError(sid)
 
-        response_json = serval_response.json()
+        response_json = decode_json(serval_response)
 
         return ServalIdentity(self, **response_json["identity"])
 
@@ -249,7 +249,7 @@ class Keyring:
         if serval_response.status_code == 404:
             raise IdentityNotFoundError(identity.sid)
 
-        reply_json = serval_response.json()
+        reply_json = decode_json(serval_response)
         return ServalIdentity(self, **reply_json["identity"])
 
     def set(
@@ -290,7 +290,7 @@ class Keyring:
         if serval_response.status_code == 404:
             raise IdentityNotFoundError(identity.sid)
 
-        response_json = serval_response.json()
+        response_json = decode_json(serval_response)
 
         return ServalIdentity(self, **response_json["identity"])
 
@@ -337,7 +337,7 @@ class Keyring:
         if serval_response.status_code == 404:
             raise IdentityNotFoundError(identity.sid)
 
-        response_json = serval_response.json()
+        response_json = decode_json(serval_response)
 
         return ServalIdentity(self, **response_json["identity"])
 
@@ -355,6 +355,6 @@ class Keyring:
         if serval_response.status_code == 404:
             raise IdentityNotFoundError(identity.sid)
 
-        response_json = serval_response.json()
+        response_json = decode_json(serval_response)
 
         return ServalIdentity(self, **response_json["identity"])
@@ -5,7 +5,7 @@ pyserval.lowlevel.client
 Collection of API-objects
 """
 
-from pyserval.lowlevel.connection import RestfulConnection
+from pyserval.lowlevel.connection import ClosableMixin, RestfulConnection, POOL_MAXSIZE
 from pyserval.lowlevel.keyring import LowLevelKeyring
 from pyserval.lowlevel.rhizome import LowLevelRhizome
 from pyserval.lowlevel.meshms import LowLevelMeshMS
@@ -13,7 +13,7 @@ from pyserval.lowlevel.meshmb import LowLevelMeshMB
 from pyserval.lowlevel.route import LowLevelRoute
 
 
-class LowLevelClient:
+class LowLevelClient(ClosableMixin):
     """Aggregates the low level API-interfaces in one place
 
     If you do not have a specific reason to use the low-level primitives,
@@ -50,6 +50,7 @@ class LowLevelClient:
         port: int = 4110,
         user: str = "pyserval",
         passwd: str = "pyserval",
+        pool_maxsize: int = POOL_MAXSIZE,
     ):
         """Utility-method that creates a connection-object and then a lient from it
 
@@ -58,9 +59,12 @@ class LowLevelClient:
             port (int): Port to connect to
             user (str): Username for HTTP basic auth
             passwd (str): Password for HTTP basic auth
+            pool_maxsize (int): Maximum number of kept-alive connections, see RestfulConnection
 
         Returns:
             LowLevelClient: Fully instantiated client
         """
-        connection = RestfulConnection(host=host, port=port, user=user, passwd=passwd)
+        connection = RestfulConnection(
+            host=host, port=port, user=user, passwd=passwd, pool_maxsize=pool_maxsize
+        )
         return LowLevelClient(connection=connection)
@@ -6,7 +6,44 @@ This module contains the means to interact directly with the REST-interface
 """
 
 import requests
-from typing import Any
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+
+from pyserval.exceptions import ConnectionClosedError
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Any, Callable, Iterable, Iterator, Union
+
+# default maximum number of (kept-alive) connections to the serval-server
+POOL_MAXSIZE = 32
+
+
+class ClosableMixin:
+    """Provides 'close' (and concurrent requests) for interfaces which send their requests
+    through a RestfulConnection
+
+    Note:
+        The interface has to keep the connection-object in its '_connection'-attribute
+    """
+
+    def close(self) -> None:
+        """Closes the connections kept alive by the underlying connection-object
+
+        Note:
+            The connection-object may be shared with other interfaces (e.g. by LowLevelClient),
+            those will simply open new connections for their requests when needed,
+            but can't run concurrent requests anymore (see RestfulConnection.close)
+        """
+        self._connection.close()
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """Runs a function on the executor of the connection-object, see RestfulConnection.submit"""
+        return self._connection.submit(fn, *args, **kwargs)
+
+    def map(self, fn: Callable[..., Any], *iterables: Iterable[Any]) -> Iterator[Any]:
+        """Maps a function on the executor of the connection-object, see RestfulConnection.map"""
+        return self._connection.map(fn, *iterables)
 
 
 class RestfulConnection:
@@ -14,11 +51,18 @@ class RestfulConnection:
 
     Used by other modules for HTTP-communication
 
+    All requests are sent through a single requests.Session,
+    so that connections to the serval-server are kept alive and reused
+    Concurrent requests of the high-level interfaces are run by a single executor,
+    which has (at most) one worker per kept-alive connection
+
     Args:
         host (str): Hostname to connect to
         port (int): Port to connect to
         user (str): Username for HTTP basic auth
         passwd (str): Password for HTTP basic auth
+        pool_maxsize (int): Maximum number of connections to the server which are kept alive
+                            (should be at least the number of threads sending requests)
     """
 
     def __init__(
@@ -27,13 +71,99 @@ class RestfulConnection:
         port: int = 4110,
         user: str = "pyserval",
         passwd: str = "pyserval",
+        pool_maxsize: int = POOL_MAXSIZE,
     ) -> None:
         self._AUTH = (user, passwd)
         self._BASE = f"http://{host}:{port}"
 
+        self._session = requests.Session()
+        self._session.auth = self._AUTH
+        # failed connection attempts are always retried,
+        # failures after the request was sent only for idempotent methods (i.e. not POST)
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=pool_maxsize,
+            max_retries=Retry(total=2, backoff_factor=0.1),
+        )
+        self._session.mount("http://", adapter)
+
+        self._pool_maxsize = pool_maxsize
+        self._executor: Union[ThreadPoolExecutor, None] = None
+        # guards the executor & the closed-flag, so that nothing is submitted after close
+        self._executor_lock = Lock()
+        self._closed = False
+
     def __repr__(self) -> str:
         return f'RestfulConnection("{self._BASE}")'
 
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Gets the executor for concurrent requests over this connection (lock must be held)
+
+        Created on first use (threads are only started when needed),
+        with as many workers as there are kept-alive connections (pool_maxsize)
+
+        Returns:
+            ThreadPoolExecutor: Executor shared by all users of this object
+
+        Raises:
+            ConnectionClosedError: If the connection has been closed
+        """
+        if self._closed:
+            raise ConnectionClosedError()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._pool_maxsize)
+        return self._executor
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """Runs a function concurrently, on the executor shared by all users of this object
+
+        Args:
+            fn (Callable[..., Any]): Function to be called
+            args (Any): Positional arguments for fn
+            kwargs (Any): Keyword arguments for fn
+
+        Returns:
+            Future: Result of the call
+
+        Raises:
+            ConnectionClosedError: If the connection has been closed
+        """
+        with self._executor_lock:
+            return self._get_executor().submit(fn, *args, **kwargs)
+
+    def map(self, fn: Callable[..., Any], *iterables: Iterable[Any]) -> Iterator[Any]:
+        """Like the builtin map, but calls the function concurrently (see 'submit')
+
+        All calls are submitted immediately, the results are returned in order
+
+        Args:
+            fn (Callable[..., Any]): Function to be called
+            iterables (Iterable[Any]): Arguments for fn
+
+        Returns:
+            Iterator[Any]: Results of the calls, raises their exceptions when reached
+
+        Raises:
+            ConnectionClosedError: If the connection has been closed
+        """
+        with self._executor_lock:
+            return self._get_executor().map(fn, *iterables)
+
+    def close(self) -> None:
+        """Closes all connections kept alive by this object
+
+        Also stops the executor (after its pending requests have been sent).
+        Afterwards, plain requests open new connections when needed,
+        but 'submit' & 'map' raise ConnectionClosedError
+        """
+        with self._executor_lock:
+            self._closed = True
+            if self._executor is not None:
+                # don't wait, close might be called from one of the workers
+                self._executor.shutdown(wait=False)
+                self._executor = None
+        self._session.close()
+
     def get(self, path: str, **params: Any) -> requests.models.Response:
         """Sends GET-request to REST-API
 
@@ -45,7 +175,7 @@ class RestfulConnection:
             requests.models.Response: Response returned by the serval-server
         """
 
-        response = requests.get(self._BASE + path, auth=self._AUTH, **params)
+        response = self._session.get(self._BASE + path, **params)
 
         if response.encoding is None:
             response.encoding = "utf-8"
@@ -62,7 +192,7 @@ class RestfulConnection:
         Returns:
             requests.models.Response: Response returned by the serval-server
         """
-        response = requests.post(self._BASE + path, auth=self._AUTH, **params)
+        response = self._session.post(self._BASE + path, **params)
 
         if response.encoding is None:
             response.encoding = "utf-8"
@@ -79,7 +209,7 @@ class RestfulConnection:
         Returns:
             requests.models.Response: Response returned by the serval-server
         """
-        response = requests.put(self._BASE + path, auth=self._AUTH, **params)
+        response = self._session.put(self._BASE + path, **params)
 
         if response.encoding is None:
             response.encoding = "utf-8"
@@ -96,7 +226,7 @@ class RestfulConnection:
         Returns:
             requests.models.Response: Response returned by the serval-server
         """
-        response = requests.delete(self._BASE + path, auth=self._AUTH, **params)
+        response = self._session.delete(self._BASE + path, **params)
 
         if response.encoding is None:
             response.encoding = "utf-8"
@@ -113,7 +243,7 @@ class RestfulConnection:
         Returns:
             requests.models.Response: Response returned by the serval-server
         """
-        response = requests.patch(self._BASE + path, auth=self._AUTH, **params)
+        response = self._session.patch(self._BASE + path, **params)
 
         if response.encoding is None:
             response.encoding = "utf-8"
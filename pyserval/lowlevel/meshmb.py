@@ -5,11 +5,29 @@ pyserval.lowlevel.meshmb
 This module contains the means to publish and subscribe MeshMB feeds
 """
 
-from pyserval.connection import RestfulConnection
+from functools import lru_cache
+
+from pyserval.lowlevel.connection import ClosableMixin, RestfulConnection
 from requests.models import Response
 
 
-class LowLevelMeshMB:
+@lru_cache(maxsize=16)
+def _feed_path(feedid: str) -> str:
+    """Builds (and caches) the endpoint-prefix for an identity/feed
+
+    A client usually works with only a handful of identities,
+    so the prefix is built once and then only has the endpoint appended
+
+    Args:
+        feedid (str): Signing ID of an identity (is also its Feed ID)
+
+    Returns:
+        str: Path of the form '/restful/meshmb/FEEDID/'
+    """
+    return f"/restful/meshmb/{feedid}/"
+
+
+class LowLevelMeshMB(ClosableMixin):
     """Interface to interact with the MeshMB REST-interface
 
     Args:
@@ -43,10 +61,10 @@ class LowLevelMeshMB:
             ("message", ("message1", message, f"{message_type};charset={charset}"),)
         ]
         return self._connection.post(
-            f"/restful/meshmb/{identity}/sendmessage", files=multipart
+            _feed_path(identity) + "sendmessage", files=multipart
         )
 
-    def get_messages(self, feedid: str) -> Response:
+    def get_messages(self, feedid: str, stream: bool = False) -> Response:
         """Get all the messages of a feed
 
         Endpoint:
@@ -54,11 +72,15 @@ class LowLevelMeshMB:
 
         Args:
             feedid (str): Feed ID (is also Signing ID of the feed author)
+            stream (bool): If set, the body is only received while reading the response
+                           (e.g. via 'iter_content'), instead of all at once
 
         Returns:
             requests.models.Response: Response returned by the serval-server
         """
-        return self._connection.get(f"/restful/meshmb/{feedid}/messagelist.json")
+        return self._connection.get(
+            _feed_path(feedid) + "messagelist.json", stream=stream
+        )
 
     def follow_feed(self, identity: str, feedid: str) -> Response:
         """Follows a feed
@@ -71,7 +93,7 @@ class LowLevelMeshMB:
                             which should follow the feed
             feedid (str): Feed ID
         """
-        return self._connection.post(f"/restful/meshmb/{identity}/follow/{feedid}")
+        return self._connection.post(_feed_path(identity) + "follow/" + feedid)
 
     def unfollow_feed(self, identity: str, feedid: str) -> Response:
         """Unfollows a feed
@@ -84,7 +106,7 @@ class LowLevelMeshMB:
                             which should unfollow the feed
             feedid (str): Feed ID
         """
-        return self._connection.post(f"/restful/meshmb/{identity}/ignore/{feedid}")
+        return self._connection.post(_feed_path(identity) + "ignore/" + feedid)
 
     def get_feedlist(self, identity: str) -> Response:
         """Get a list of all followed identities
@@ -98,9 +120,9 @@ class LowLevelMeshMB:
         Returns:
             requests.models.Response: Response returned by the serval-server
         """
-        return self._connection.get(f"/restful/meshmb/{identity}/feedlist.json")
+        return self._connection.get(_feed_path(identity) + "feedlist.json")
 
-    def get_activity(self, identity: str) -> Response:
+    def get_activity(self, identity: str, stream: bool = False) -> Response:
         """Get all the messages from followed feeds
 
         Endpoint:
@@ -108,8 +130,12 @@ class LowLevelMeshMB:
 
         Args:
             identity (str): Signing ID of an (unlocked) identity in the keyring
+            stream (bool): If set, the body is only received while reading the response
+                           (e.g. via 'iter_content'), instead of all at once
 
         Returns:
             requests.models.Response: Response returned by the serval-server
         """
-        return self._connection.get(f"/restful/meshmb/{identity}/activity.json")
+        return self._connection.get(
+            _feed_path(identity) + "activity.json", stream=stream
+        )
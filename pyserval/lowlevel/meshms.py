@@ -5,11 +5,11 @@ pyserval.lowlevel.meshms
 This module contains the means to send and receive MeshMS-messages
 """
 
-from pyserval.connection import RestfulConnection
+from pyserval.lowlevel.connection import ClosableMixin, RestfulConnection
 from requests.models import Response
 
 
-class LowLevelMeshMS:
+class LowLevelMeshMS(ClosableMixin):
     """Interface to access MeshMS-related endpoints of the REST-interface
 
     Args:
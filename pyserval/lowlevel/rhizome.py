@@ -5,11 +5,22 @@ pyserval.lowlevel.rhizome
 This module contains the means to interact with rhizome, the serval distributed file-store
 """
 
+import re
+
+from itertools import chain
+from operator import attrgetter
+
 from pyserval.exceptions import JournalError, InvalidManifestError
-from pyserval.lowlevel.connection import RestfulConnection
-from typing import Union, Any, List, Tuple
+from pyserval.lowlevel.connection import ClosableMixin, RestfulConnection
+from typing import Union, Any, Dict, Iterable, List, Tuple
 from requests.models import Response
 
+# service names and custom manifest fields are restricted to (ASCII) alphanumerics
+_ALPHANUMERIC = re.compile(r"[0-9A-Za-z]+").fullmatch
+
+# Bundle IDs consist of 64 hexadecimal digits
+_BUNDLE_ID = re.compile(r"[0-9A-Fa-f]{64}").fullmatch
+
 
 class Manifest:
     """Representation of a rhizome-bundle's manifest
@@ -35,8 +46,36 @@ class Manifest:
                   Enable by setting 'bundle_author' in Rhizome.insert/append
         kwargs (str): Additional custom metadata
                     (See examples.rhizome for usage)
+
+    Note:
+        The standard fields are stored in slots,
+        custom fields are kept in the instance's __dict__
     """
 
+    # fields defined by rhizome itself
+    FIELDS = (
+        "id",
+        "version",
+        "filesize",
+        "service",
+        "date",
+        "filehash",
+        "tail",
+        "sender",
+        "recipient",
+        "name",
+        "crypt",
+        "BK",
+    )
+
+    # types of the (non-string) fields, see 'autocast'
+    _TYPES = {"version": int, "filesize": int, "date": int, "tail": int, "crypt": int}
+
+    __slots__ = FIELDS + ("_header", "__dict__")
+
+    # returns the values of all standard fields as a tuple
+    _values = attrgetter(*FIELDS)
+
     def __init__(
         self,
         id: Union[str, None] = None,
@@ -67,43 +106,85 @@ class Manifest:
         self.BK = BK
         self.__dict__.update(kwargs)
 
-        self._types = {
-            "version": int,
-            "filesize": int,
-            "date": int,
-            "tail": int,
-            "crypt": int,
-        }
+        # cached text-representation, see '_serialise'
+        self._header: Union[str, None] = None
+
+    @classmethod
+    def from_values(cls, values: Iterable[Any]) -> "Manifest":
+        """Creates a manifest from the values of the standard fields
+
+        Args:
+            values (Iterable[Any]): Values of the standard fields, in the order of FIELDS
+
+        Returns:
+            Manifest: Manifest with the given values
+        """
+        # skips __init__ & __setattr__ - there is no cached header to invalidate yet
+        manifest = cls.__new__(cls)
+        set_field = object.__setattr__
+        for field, value in zip(cls.FIELDS, values):
+            set_field(manifest, field, value)
+        set_field(manifest, "_header", None)
+        return manifest
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        # changing any manifest field invalidates the cached header
+        if not key.startswith("_"):
+            object.__setattr__(self, "_header", None)
+        object.__setattr__(self, key, value)
 
     def __repr__(self) -> str:
-        return str(self.__dict__)
+        return str(self._asdict())
 
     def __eq__(self, other: Any) -> bool:
         if not isinstance(other, Manifest):
             return False
 
         # two manifests are equal, if all their fields (including custom fields) are equal
-        for key, value in self.__dict__.items():
-            try:
-                if not other.__dict__[key] == value:
-                    return False
-            except KeyError:
-                return False
+        return (
+            self._values(self) == other._values(other)
+            and self.__dict__ == other.__dict__
+        )
 
-        return True
+    def _asdict(self) -> Dict[str, Any]:
+        """Get all manifest fields (standard & custom) as a dict
+
+        Returns:
+            Dict[str, Any]: Mapping of fieldname to value, including fields which are None
+        """
+        data = {key: getattr(self, key) for key in self.FIELDS}
+        data.update(self.__dict__)
+        return data
 
-    def fields(self) -> List[Tuple[str, Any]]:
-        """Get List of (fieldname, value) tuples of all relevant manifest fields
+    def fields(self) -> Tuple[Tuple[str, Any], ...]:
+        """Get Tuple of (fieldname, value) tuples of all relevant manifest fields
 
         Returns:
-            List[Tuple[str, Any]]: Fields which are not None
+            Tuple[Tuple[str, Any], ...]: Fields which are not None
         """
-        items = []
-        for key, value in self.__dict__.items():
-            if value is not None and not key.startswith("_"):
-                items.append((key, value))
+        items = chain(zip(self.FIELDS, self._values(self)), self.__dict__.items())
+        return tuple((key, value) for key, value in items if value is not None)
 
-        return items
+    def _serialise(self) -> str:
+        """Get the manifest in the text-format expected by the insert/append-endpoints
+
+        The result is cached until the manifest is modified
+        (private, so that it can't be shadowed by a custom field of the same name)
+
+        Returns:
+            str: One 'key=value'-line per (non-empty) field
+        """
+        if self._header is None:
+            # Emptystring or None should be ignored
+            # The number 0 should be included
+            lines = [
+                f"{key}={value}\n"
+                for key, value in self.fields()
+                if value or value == 0
+            ]
+            self._header = "".join(lines)
+
+        return self._header
 
     def update(self, response_data: str) -> None:
         """Updates the Manifest with data from a Rhizome HTTP response
@@ -112,14 +193,21 @@ class Manifest:
             response_data (str): Manifest in text+binarysig format
             (https://github.com/servalproject/serval-dna/blob/development/doc/REST-API-Rhizome.md#textbinarysig-manifest-format)
         """
-        pure_manifest = response_data.split("\0")[0]
-        values = {}
+        # only the part before the signature-block is relevant
+        pure_manifest = response_data.split("\0", 1)[0]
+        # same as 'autocast', but without a method-call per line
+        types = self._TYPES
         for line in pure_manifest.splitlines():
-            key, value = line.split("=")
-            value = self.autocast(key, value)
-            values[key] = value
+            # values may themselves contain '=', so only split at the first one
+            key, separator, value = line.partition("=")
+            if separator:
+                cast = types.get(key)
+                if cast is not None:
+                    value = cast(value)
+                # standard fields end up in their slot, custom fields in __dict__
+                object.__setattr__(self, key, value)
 
-        self.__dict__.update(values)
+        self._header = None
 
     def update_manual(self, **kwargs: Union[str, int]):
         """Update the manifest's data
@@ -131,9 +219,10 @@ class Manifest:
             # Serval does not allow the '_'-character for custom fields,
             # but I don't know if there are any other restrictions - the documentation doesn't say
             # which is why I chose to restrict it to alphanumerics - to b on the safe side
-            assert key.isalnum(), "Custom fields must be alphanumeric"
+            assert _ALPHANUMERIC(key), "Custom fields must be alphanumeric"
 
-        self.__dict__.update(kwargs)
+        for key, value in kwargs.items():
+            setattr(self, key, value)
 
     def is_valid(self) -> bool:
         """Checks whether the manifest is valid
@@ -144,7 +233,7 @@ class Manifest:
         if self.service:
             # apparently service names may only by alphanumeric
             # even though the documentation does not say so...
-            if not self.service.isalnum():
+            if not _ALPHANUMERIC(self.service):
                 raise InvalidManifestError(
                     key="service",
                     value=str(self.service),
@@ -157,7 +246,7 @@ class Manifest:
         Rhizome HTTP replies for manifests are always strings,
         but the underlying type might be different
 
-        Checks the object's 'types'-dict to determine if the value should be cast to another type
+        Checks the class' '_TYPES'-dict to determine if the value should be cast to another type
         or left unchanged.
 
         Args:
@@ -167,13 +256,13 @@ class Manifest:
         Returns:
             Any: Possibly cast value
         """
-        try:
-            return self._types[field_name](value)
-        except KeyError:
+        cast = self._TYPES.get(field_name)
+        if cast is None:
             return value
+        return cast(value)
 
 
-class LowLevelRhizome:
+class LowLevelRhizome(ClosableMixin):
     """Interface to access Rhizome-related endpoints of the REST-interface
 
     Args:
@@ -213,7 +302,7 @@ class LowLevelRhizome:
             f"/restful/rhizome/newsince/{token}/bundlelist.json", stream=True
         )
 
-    def get_manifest(self, bid: str) -> Response:
+    def get_manifest(self, bid: str, etag: Union[str, None] = None) -> Response:
         """Gets the manifest for a specified BID
 
         Endpoint:
@@ -221,13 +310,20 @@ class LowLevelRhizome:
 
         Args:
             bid (str): Bundle ID
+            etag (Union[str, None]): ETag of a previously received version of the manifest
+                                     If it is still current, the server replies with 304
 
         Returns:
             requests.models.Response: Response returned by the serval-server
         """
-        return self._connection.get(f"/restful/rhizome/{bid}.rhm")
+        assert _BUNDLE_ID(bid), "Bundle ID must be 64 hexadecimal digits"
+        if etag is None:
+            return self._connection.get(f"/restful/rhizome/{bid}.rhm")
+        return self._connection.get(
+            f"/restful/rhizome/{bid}.rhm", headers={"If-None-Match": etag}
+        )
 
-    def get_raw(self, bid: str) -> Response:
+    def get_raw(self, bid: str, stream: bool = False) -> Response:
         """Gets the raw payload of a bundle
 
         Endpoint:
@@ -235,6 +331,8 @@ class LowLevelRhizome:
 
         Args:
             bid (str): Bundle ID
+            stream (bool): If set, the payload is only received while reading the response
+                           (e.g. via 'iter_content'), instead of all at once
 
         Returns:
             requests.models.Response: Response returned by the serval-server
@@ -242,9 +340,10 @@ class LowLevelRhizome:
         Note:
             If the payload is encrypted, this method will return the ciphertext
         """
-        return self._connection.get(f"/restful/rhizome/{bid}/raw.bin")
+        assert _BUNDLE_ID(bid), "Bundle ID must be 64 hexadecimal digits"
+        return self._connection.get(f"/restful/rhizome/{bid}/raw.bin", stream=stream)
 
-    def get_decrypted(self, bid: str) -> Response:
+    def get_decrypted(self, bid: str, stream: bool = False) -> Response:
         """Gets the decrypted payload of a bundle
 
         Endpoint:
@@ -252,6 +351,8 @@ class LowLevelRhizome:
 
         Args:
             bid (str): Bundle ID
+            stream (bool): If set, the payload is only received while reading the response
+                           (e.g. via 'iter_content'), instead of all at once
 
         Returns:
             requests.models.Response: Response returned by the serval-server
@@ -264,7 +365,10 @@ class LowLevelRhizome:
 
             If the payload is encrypted and the decryption key is unknown, the call will fail
         """
-        return self._connection.get(f"/restful/rhizome/{bid}/decrypted.bin")
+        assert _BUNDLE_ID(bid), "Bundle ID must be 64 hexadecimal digits"
+        return self._connection.get(
+            f"/restful/rhizome/{bid}/decrypted.bin", stream=stream
+        )
 
     @staticmethod
     def _format_params(
@@ -308,21 +412,13 @@ class LowLevelRhizome:
         if bundle_secret:
             params.append(("bundle-secret", bundle_secret))
 
-        # marshall manifest
-        manifest_header = ""
-
-        for (key, value) in manifest.fields():
-            # Emptystring or None should be ignored
-            # The number 0 should be included
-            if value or value == 0:
-                manifest_header += f"{key}={value}\n"
-
+        # the manifest is passed as (UTF-8) bytes, so that requests doesn't have to encode it
         params.append(
             (
                 "manifest",
                 (
                     "manifest1",
-                    manifest_header,
+                    manifest._serialise().encode("utf-8"),
                     'rhizome/manifest;format="text+binarysig"',
                 ),
             )
@@ -5,8 +5,36 @@ pyserval.lowlevel.util
 This module contains utility-methods
 """
 
-from random import SystemRandom
-from typing import Dict, List, Union, Type, Any
+import codecs
+import json
+
+from functools import lru_cache
+from keyword import iskeyword
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from secrets import token_hex
+from requests.models import Response
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Tuple,
+    Type,
+    Union,
+)
+
+_WHITESPACE = " \t\r\n"
+
+# maximum size (in bytes) of the parts yielded by 'iter_received'
+STREAM_CHUNK_SIZE = 64 * 1024
 
 
 def decode_json_table(json: Dict[str, List[Union[str, List[str]]]]) -> List[dict]:
@@ -27,14 +55,134 @@ def decode_json_table(json: Dict[str, List[Union[str, List[str]]]]) -> List[dict
     Returns:
         List[dict]: List of dictionaries containing separate JSON-objects
     """
-    data = []
+    # transform each row of the table into a dictionary for a single object
+    header = json["header"]
+    return [dict(zip(header, row)) for row in json["rows"]]
+
+
+def iter_received(
+    response: Response, chunk_size: int = STREAM_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Yields the body of a streamed response, as soon as any part of it has been received
+
+    'response.iter_content' only returns once a whole chunk has been received
+    (or the connection has been closed) - for the 'newsince'-endpoints, which keep sending
+    for as long as the server does not time out, this would delay every update until then
+
+    Args:
+        response (requests.models.Response): Response, requested with 'stream=True'
+        chunk_size (int): Maximum size (in bytes) of the yielded parts
+
+    Yields:
+        bytes: Next part of the body
+    """
+    read1 = getattr(response.raw, "read1", None)
+    if read1 is None:
+        # urllib3 < 2.0 has no partial reads, but still yields each part of a chunked
+        # body as soon as it has been received (up to chunk_size bytes at a time)
+        yield from response.iter_content(chunk_size=chunk_size)
+        return
+
+    while True:
+        # decode_content, so that compressed bodies are decompressed like in iter_content
+        chunk = read1(chunk_size, decode_content=True)
+        if not chunk:
+            return
+        yield chunk
+
 
-    for row in json["rows"]:
-        # transform row of table
-        # into dictionary for single object
-        data.append(dict(zip(json["header"], row)))
+def stream_json_rows(chunks: Iterable[bytes]) -> Iterator[Tuple[List[str], List[Any]]]:
+    """Incrementally decodes a JSON-table (see decode_json_table) which is still being received
 
-    return data
+    Each row is yielded as soon as it has been received completely,
+    instead of waiting for the whole response (which, for the 'newsince'-endpoints,
+    is only complete once the server times out)
+    Only the part of the body which has not been decoded yet is kept in memory
+
+    Args:
+        chunks (Iterable[bytes]): Raw body of the response, e.g. 'iter_received(response)'
+
+    Yields:
+        Tuple[List[str], List[Any]]: The table's header (the same object for every row)
+                                     and the values of a single row
+    """
+    decoder = json.JSONDecoder()
+    # chunks may end in the middle of a multi-byte character
+    text = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    header = None
+    in_rows = False
+
+    for chunk in chunks:
+        buffer = buffer[position:] + text.decode(chunk)
+        position = 0
+
+        if header is None:
+            start = buffer.find('"header"')
+            if start != -1:
+                start = buffer.find("[", start)
+            if start == -1:
+                continue
+            try:
+                header, position = decoder.raw_decode(buffer, start)
+            except ValueError:
+                # header is not complete yet
+                continue
+
+        if not in_rows:
+            start = buffer.find('"rows"', position)
+            if start != -1:
+                start = buffer.find("[", start)
+            if start == -1:
+                continue
+            position = start + 1
+            in_rows = True
+
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE + ",":
+                position += 1
+            if position == len(buffer):
+                break
+            if buffer[position] == "]":
+                # end of table
+                return
+            try:
+                row, position = decoder.raw_decode(buffer, position)
+            except ValueError:
+                # row is not complete yet
+                break
+            yield header, row
+
+
+def decode_json(response: Response) -> Any:
+    """Parses the JSON-body of a response straight from its raw bytes
+
+    Serval always sends UTF-8, so there is no need to go through requests' text-decoding
+    (which is what 'response.json()' does)
+    If orjson is installed, it is used instead of the (slower) standard library parser
+
+    Args:
+        response (requests.models.Response): Response returned by the serval-server
+
+    Returns:
+        Any: Decoded JSON-data
+    """
+    return loads_json(response.content)
+
+
+def loads_json(data: Union[bytes, bytearray]) -> Any:
+    """Parses UTF-8 encoded JSON-data, using orjson if it is installed
+
+    Args:
+        data (Union[bytes, bytearray]): Encoded JSON-document
+
+    Returns:
+        Any: Decoded JSON-data
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
 
 
 def generate_secret() -> str:
@@ -45,15 +193,79 @@ def generate_secret() -> str:
     Returns:
         str: String of 64 random hex-digits (32 bytes of random data)
     """
-    randomiser = SystemRandom()
-    secret = "".join([randomiser.choice("0123456789ABCDEF") for _ in range(64)])
-    return secret
+    return token_hex(32).upper()
+
+
+def _positional_parameters(object_class: Type) -> Tuple[str, ...]:
+    """Gets the parameters of a constructor which can be passed positionally
+
+    Args:
+        object_class: Class whose constructor is inspected
+
+    Returns:
+        Tuple[str, ...]: Names of the parameters (without 'self'),
+                         empty if the constructor is not implemented in Python
+    """
+    code = getattr(object_class.__init__, "__code__", None)
+    if code is None:
+        return ()
+    return code.co_varnames[1 : code.co_argcount]
+
+
+@lru_cache(maxsize=64)
+def _row_factory(
+    object_class: Type, header: Tuple[str, ...], kwarg_names: FrozenSet[str]
+) -> Union[Callable[[List[Any], Dict[str, Any]], Any], None]:
+    """Generates a function which creates an instance of object_class from a single table-row
+
+    Instead of building a dict for every row and unpacking it into the constructor,
+    the generated function passes the columns directly - positionally, as far as the
+    constructor's parameters are all present, by keyword after that
+    i.e. 'object_class(row[1], row[0], c=row[2], d=kwargs["d"])'
+
+    Args:
+        object_class: Class to unmarshall into
+        header (Tuple[str, ...]): Header of the JSON-table
+        kwarg_names (FrozenSet[str]): Names of the additional constructor parameters,
+                                      which take precedence over columns of the same name
+
+    Returns:
+        Union[Callable[[List[Any], Dict[str, Any]], Any], None]:
+            Takes a row and the additional parameters, returns the new object
+            None, if a column-name can't be used as a keyword-argument
+    """
+    if len(set(header)) != len(header):
+        # duplicate columns would be a repeated keyword-argument
+        return None
+
+    values = {name: f"kwargs[{name!r}]" for name in kwarg_names}
+    for index, column in enumerate(header):
+        if column not in kwarg_names:
+            values[column] = f"row[{index}]"
+
+    arguments = []
+    for parameter in _positional_parameters(object_class):
+        if parameter not in values:
+            break
+        arguments.append(values.pop(parameter))
+
+    for name, value in values.items():
+        if not name.isidentifier() or iskeyword(name):
+            return None
+        arguments.append(f"{name}={value}")
+
+    source = (
+        f"def build(row, kwargs):\n    return object_class({', '.join(arguments)})\n"
+    )
+    namespace = {}
+    exec(source, {"object_class": object_class}, namespace)
+    return namespace["build"]
 
 
 def unmarshall(
     json_table: Dict[str, List[Union[str, List[str]]]],
     object_class: Type,
-    **kwargs: Any
+    **kwargs: Any,
 ):
     """Unmarshalls a Json-Table into a list of Python-objects
 
@@ -73,9 +285,40 @@ def unmarshall(
         object_class: Instance of the specified class
                       initialised with the data from json_table and kwargs
     """
-    json_data = decode_json_table(json_table)
-    objects = []
-    for data in json_data:
-        data.update(**kwargs)
-        objects.append(object_class(**data))
-    return objects
+    header = json_table["header"]
+    rows = json_table["rows"]
+
+    build = _row_factory(object_class, tuple(header), frozenset(kwargs))
+    if build is not None:
+        return [build(row, kwargs) for row in rows]
+
+    # the kwargs are merged in while building each row's dict (taking precedence over the row)
+    return [object_class(**dict(zip(header, row), **kwargs)) for row in rows]
+
+
+def stream_unmarshall(
+    chunks: Iterable[bytes], object_class: Type, **kwargs: Any
+) -> Iterator[Any]:
+    """Incrementally unmarshalls a Json-Table which is still being received
+
+    Like 'unmarshall', but yields each object as soon as its row has been received
+
+    Args:
+        chunks (Iterable[bytes]): Raw body of the response, e.g. 'iter_received(response)'
+        object_class: Class to unmarshall into
+        kwargs: additional parameters for the object_class constructor
+
+    Yields:
+        object_class: Instance of the specified class
+                      initialised with the data from a single row and kwargs
+    """
+    build = None
+    for header, row in stream_json_rows(chunks):
+        if build is None:
+            build = _row_factory(object_class, tuple(header), frozenset(kwargs))
+            if build is None:
+                # same as the generic path of 'unmarshall'
+                build = lambda row, kwargs: object_class(
+                    **dict(zip(header, row), **kwargs)
+                )
+        yield build(row, kwargs)
@@ -5,11 +5,22 @@ pyserval.meshmb
 This module contains the means to publish and subscribe MeshMB feeds
 """
 
+from concurrent.futures import Future
+from functools import lru_cache
+from sys import intern
+
+from pyserval.connection import ClosableInterface
 from pyserval.lowlevel.meshmb import LowLevelMeshMB
 from pyserval.keyring import ServalIdentity
-from pyserval.lowlevel.util import unmarshall, decode_json_table
-from pyserval.exceptions import RhizomeHTTPStatusError
-from typing import Union, List
+from pyserval.lowlevel.util import (
+    decode_json,
+    iter_received,
+    stream_json_rows,
+    stream_unmarshall,
+    unmarshall,
+)
+from pyserval.exceptions import FeedBatchError, RhizomeHTTPStatusError
+from typing import Any, Callable, Iterator, Union, List, Tuple
 
 
 class BroadcastMessage:
@@ -36,6 +47,17 @@ class BroadcastMessage:
         timestamp (int): UNIX-timestamp of when the message was sent
     """
 
+    __slots__ = (
+        "id",
+        "author",
+        "name",
+        "offset",
+        "ack_offset",
+        "token",
+        "text",
+        "timestamp",
+    )
+
     def __init__(
         self,
         id: Union[str, None] = None,
@@ -51,16 +73,18 @@ class BroadcastMessage:
         self.token = token
         self.text = text
         self.timestamp = timestamp
-        self.id = id
-        self.author = author
-        self.name = name
+        # feed-IDs, SIDs & feed-names repeat across many messages,
+        # so they share a single string object (the text is not worth interning)
+        self.id = intern(id) if id else id
+        self.author = intern(author) if author else author
+        self.name = intern(name) if name else name
         self.ack_offset = ack_offset
 
-    def __str__(self) -> str:
-        return str(self.__dict__)
-
     def __repr__(self) -> str:
-        return str(self.__dict__)
+        return (
+            f"BroadcastMessage(id={self.id!r}, author={self.author!r}, "
+            f"offset={self.offset}, timestamp={self.timestamp}, text={self.text!r})"
+        )
 
 
 class Feed:
@@ -85,6 +109,16 @@ class Feed:
 
     """
 
+    __slots__ = (
+        "_meshmb",
+        "id",
+        "author",
+        "blocked",
+        "name",
+        "timestamp",
+        "last_message",
+    )
+
     def __init__(
         self,
         meshmb,
@@ -96,18 +130,18 @@ class Feed:
         last_message: str,
     ):
         self._meshmb = meshmb
-        self.id = id
-        self.author = author
+        self.id = intern(id) if id else id
+        self.author = intern(author) if author else author
         self.blocked = blocked
-        self.name = name
+        self.name = intern(name) if name else name
         self.timestamp = timestamp
         self.last_message = last_message
 
-    def __str__(self) -> str:
-        return str(self.__dict__)
-
     def __repr__(self) -> str:
-        return str(self.__dict__)
+        return (
+            f"Feed(id={self.id!r}, author={self.author!r}, name={self.name!r}, "
+            f"blocked={self.blocked}, timestamp={self.timestamp})"
+        )
 
     def follow(self, identity: str) -> None:
         """Follow this feed
@@ -132,7 +166,73 @@ class Feed:
         self._meshmb.get_messages(self.id)
 
 
-class MeshMB:
+# activity.json names some columns differently than the BroadcastMessage-constructor
+ACTIVITY_COLUMNS = {".token": "token", "message": "text"}
+
+
+@lru_cache(maxsize=16)
+def _activity_builder(
+    header: Tuple[str, ...]
+) -> Callable[[List[Any]], BroadcastMessage]:
+    """Gets a function which creates a BroadcastMessage from a row of activity.json
+
+    The header is the same for every response of a given server,
+    so the function is generated once (with the column indices baked in) and then cached
+    (get_messages and get_feedlist get the same treatment from 'unmarshall')
+
+    Args:
+        header (Tuple[str, ...]): Header of the JSON-table
+
+    Returns:
+        Callable[[List[Any]], BroadcastMessage]: Takes a row of the table, returns the message
+    """
+    code = BroadcastMessage.__init__.__code__
+    fields = code.co_varnames[1 : code.co_argcount]
+    defaults = dict(zip(fields[::-1], BroadcastMessage.__init__.__defaults__[::-1]))
+
+    columns = {}
+    for index, column in enumerate(header):
+        columns[ACTIVITY_COLUMNS.get(column, column)] = index
+
+    # pass all fields positionally (in the order of the constructor's parameters)
+    # fields which are not part of the table get their default value
+    arguments = []
+    for field in fields:
+        if field in columns:
+            arguments.append(f"row[{columns[field]}]")
+        else:
+            arguments.append(f"defaults[{field!r}]")
+
+    source = f"def build(row):\n    return BroadcastMessage({', '.join(arguments)})\n"
+    namespace = {}
+    exec(
+        source, {"BroadcastMessage": BroadcastMessage, "defaults": defaults}, namespace
+    )
+    return namespace["build"]
+
+
+def _identity_string(
+    identity: Union[ServalIdentity, str], name: str = "identity"
+) -> str:
+    """Gets the Signing ID of a keyring identity, passes Signing ID-strings through unchanged
+
+    Args:
+        identity (Union[ServalIdentity, str]): Keyring identity or corresponding Signing-ID
+        name (str): Name of the checked parameter (for the error message)
+
+    Returns:
+        str: Signing ID
+    """
+    if isinstance(identity, ServalIdentity):
+        return identity.identity
+
+    assert isinstance(
+        identity, str
+    ), f"{name} must be either a ServalIdentity or Identity-string"
+    return identity
+
+
+class MeshMB(ClosableInterface):
     """Interface to interact with the MeshMB REST-interface
 
     Args:
@@ -140,6 +240,8 @@ class MeshMB:
     """
 
     def __init__(self, low_level_meshmb: LowLevelMeshMB):
+        assert isinstance(low_level_meshmb, LowLevelMeshMB)
+        ClosableInterface.__init__(self, low_level_meshmb)
         self._low_level_meshmb = low_level_meshmb
 
     def send_message(
@@ -151,22 +253,18 @@ class MeshMB:
             identity (Union[ServalIdentity, str]): Keyring identity or corresponding SID
             message (Union[bytes, str]): Message payload
         """
-        if isinstance(identity, ServalIdentity):
-            identity = identity.identity
+        identity = _identity_string(identity)
 
-        assert isinstance(
-            identity, str
-        ), "identity must be either a ServalIdentity or SID-string"
+        assert message, "message must be non-empty"
 
         if isinstance(message, str):
             message_type = "text/plain"
             charset = "utf-8"
         else:
+            assert isinstance(message, bytes), "message must be either str or bytes"
             message_type = "application/octet-stream"
             charset = None
 
-        assert message, "message must be non-empty"
-
         result = self._low_level_meshmb.send_message(
             identity=identity,
             message=message,
@@ -176,7 +274,7 @@ class MeshMB:
 
         # I would like to make a better distinction here, but unfortunately the upstream docs
         # do not specify any status codes for specific errors
-        if result.status_code != 200 and result.status_code != 201:
+        if result.status_code not in (200, 201):
             raise RhizomeHTTPStatusError(result)
 
     def get_messages(
@@ -191,12 +289,7 @@ class MeshMB:
         Returns:
             List[BroadcastMessage]: All the messages sent to this feed
         """
-        if isinstance(feedid, ServalIdentity):
-            feedid = feedid.identity
-
-        assert isinstance(
-            feedid, str
-        ), "feedid must be either a ServalIdentity or Identity-string"
+        feedid = _identity_string(feedid, name="feedid")
 
         result = self._low_level_meshmb.get_messages(feedid=feedid)
 
@@ -205,10 +298,37 @@ class MeshMB:
         if result.status_code != 200:
             raise RhizomeHTTPStatusError(result)
 
-        result_json = result.json()
+        result_json = decode_json(result)
         messages = unmarshall(json_table=result_json, object_class=BroadcastMessage)
         return messages
 
+    def iter_messages(
+        self, feedid: Union[ServalIdentity, str]
+    ) -> Iterator[BroadcastMessage]:
+        """Get all the messages of a feed, while they are being received
+
+        Unlike get_messages, the response is decoded incrementally,
+        so the whole body is never held in memory next to the decoded messages
+
+        Args:
+            feedid (Union[ServalIdentity, str]): Keyring identity or corresponding Signing-ID
+                                                 NOTE: This is NOT the same as the SID
+
+        Yields:
+            BroadcastMessage: Next message sent to this feed
+        """
+        feedid = _identity_string(feedid, name="feedid")
+
+        with self._low_level_meshmb.get_messages(feedid=feedid, stream=True) as result:
+            # I would like to make a better distinction here, but unfortunately the upstream docs
+            # do not specify any status codes for specific errors
+            if result.status_code != 200:
+                raise RhizomeHTTPStatusError(result)
+
+            yield from stream_unmarshall(
+                iter_received(result), object_class=BroadcastMessage
+            )
+
     def get_feedlist(self, identity: Union[ServalIdentity, str]) -> List[Feed]:
         """Get a list of all followed identities
 
@@ -219,12 +339,7 @@ class MeshMB:
         Returns:
             List[Feed]: List of all feeds that the specified identity is currently following
         """
-        if isinstance(identity, ServalIdentity):
-            identity = identity.identity
-
-        assert isinstance(
-            identity, str
-        ), "identity must be either a ServalIdentity or Identity-string"
+        identity = _identity_string(identity)
 
         result = self._low_level_meshmb.get_feedlist(identity=identity)
 
@@ -233,7 +348,7 @@ class MeshMB:
         if result.status_code != 200:
             raise RhizomeHTTPStatusError(result)
 
-        result_json = result.json()
+        result_json = decode_json(result)
         feeds = unmarshall(json_table=result_json, object_class=Feed, meshmb=self)
         return feeds
 
@@ -250,12 +365,7 @@ class MeshMB:
                                     the specified identity is currently following
                                     (in chronological order)
         """
-        if isinstance(identity, ServalIdentity):
-            identity = identity.identity
-
-        assert isinstance(
-            identity, str
-        ), "identity must be either a ServalIdentity or Identity-string"
+        identity = _identity_string(identity)
 
         result = self._low_level_meshmb.get_activity(identity=identity)
 
@@ -264,14 +374,58 @@ class MeshMB:
         if result.status_code != 200:
             raise RhizomeHTTPStatusError(result)
 
-        result_json = result.json()
-        message_data = decode_json_table(result_json)
-        for data in message_data:
-            data["token"] = data.pop(".token")
-            data["text"] = data.pop("message")
-        messages = [BroadcastMessage(**data) for data in message_data]
+        result_json = decode_json(result)
+        build = _activity_builder(tuple(result_json["header"]))
+        messages = [build(row) for row in result_json["rows"]]
         return messages
 
+    def get_activity_async(
+        self, identity: Union[ServalIdentity, str]
+    ) -> "Future[List[BroadcastMessage]]":
+        """Get all the messages from followed feeds, without waiting for the response
+
+        Useful for polling the activity of multiple identities concurrently
+
+        Args:
+            identity (str): Signing ID of an (unlocked) identity in the keyring
+
+        Returns:
+            Future[List[BroadcastMessage]]: Result of 'get_activity',
+                                            raises its exceptions when calling 'result()'
+        """
+        return self._low_level_meshmb.submit(self.get_activity, identity=identity)
+
+    def iter_activity(
+        self, identity: Union[ServalIdentity, str]
+    ) -> Iterator[BroadcastMessage]:
+        """Get all the messages from followed feeds, while they are being received
+
+        Unlike get_activity, the response is decoded incrementally,
+        so the whole body is never held in memory next to the decoded messages
+
+        Args:
+            identity (str): Signing ID of an (unlocked) identity in the keyring
+
+        Yields:
+            BroadcastMessage: Next message from the feeds that the specified identity
+                              is currently following (in chronological order)
+        """
+        identity = _identity_string(identity)
+
+        with self._low_level_meshmb.get_activity(
+            identity=identity, stream=True
+        ) as result:
+            # I would like to make a better distinction here, but unfortunately the upstream docs
+            # do not specify any status codes for specific errors
+            if result.status_code != 200:
+                raise RhizomeHTTPStatusError(result)
+
+            build = None
+            for header, row in stream_json_rows(iter_received(result)):
+                if build is None:
+                    build = _activity_builder(tuple(header))
+                yield build(row)
+
     def follow_feed(self, identity, feedid):
         """Follows a feed
 
@@ -283,12 +437,7 @@ class MeshMB:
                             which should follow the feed
             feedid (str): Feed ID
         """
-        if isinstance(identity, ServalIdentity):
-            identity = identity.identity
-
-        assert isinstance(
-            identity, str
-        ), "identity must be either a ServalIdentity or Identity-string"
+        identity = _identity_string(identity)
 
         result = self._low_level_meshmb.follow_feed(identity=identity, feedid=feedid)
 
@@ -308,12 +457,7 @@ class MeshMB:
                             which should unfollow the feed
             feedid (str): Feed ID
         """
-        if isinstance(identity, ServalIdentity):
-            identity = identity.identity
-
-        assert isinstance(
-            identity, str
-        ), "identity must be either a ServalIdentity or Identity-string"
+        identity = _identity_string(identity)
 
         result = self._low_level_meshmb.unfollow_feed(identity=identity, feedid=feedid)
 
@@ -321,3 +465,76 @@ class MeshMB:
         # do not specify any status codes for specific errors
         if result.status_code != 200:
             raise RhizomeHTTPStatusError(result)
+
+    def follow_feeds(
+        self, identity: Union[ServalIdentity, str], feedids: List[str]
+    ) -> None:
+        """Follows multiple feeds at once
+
+        The requests for the individual feeds are sent concurrently,
+        so following many feeds costs roughly one round-trip instead of one per feed
+
+        Args:
+            identity (Union[ServalIdentity, str]): Keyring identity or corresponding Signing-ID
+                                                   which should follow the feeds
+            feedids (List[str]): Feed IDs
+
+        Raises:
+            FeedBatchError: If following any of the feeds failed
+                            Since all requests are sent regardless, the other feeds
+                            have still been followed
+        """
+        self._for_each_feed(self.follow_feed, _identity_string(identity), feedids)
+
+    def unfollow_feeds(
+        self, identity: Union[ServalIdentity, str], feedids: List[str]
+    ) -> None:
+        """Unfollows multiple feeds at once
+
+        The requests for the individual feeds are sent concurrently,
+        so unfollowing many feeds costs roughly one round-trip instead of one per feed
+
+        Args:
+            identity (Union[ServalIdentity, str]): Keyring identity or corresponding Signing-ID
+                                                   which should unfollow the feeds
+            feedids (List[str]): Feed IDs
+
+        Raises:
+            FeedBatchError: If unfollowing any of the feeds failed
+                            Since all requests are sent regardless, the other feeds
+                            have still been unfollowed
+        """
+        self._for_each_feed(self.unfollow_feed, _identity_string(identity), feedids)
+
+    def _for_each_feed(
+        self,
+        method: Callable[..., None],
+        identity: Union[ServalIdentity, str],
+        feedids: List[str],
+    ) -> None:
+        """Internal method to call 'follow_feed'/'unfollow_feed' concurrently for multiple feeds
+
+        Args:
+            method (Callable[..., None]): Either 'follow_feed' or 'unfollow_feed'
+            identity (Union[ServalIdentity, str]): Keyring identity or corresponding Signing-ID
+            feedids (List[str]): Feed IDs
+
+        Raises:
+            FeedBatchError: Containing the errors of all failed requests
+        """
+        futures = {
+            feedid: self._low_level_meshmb.submit(
+                method, identity=identity, feedid=feedid
+            )
+            for feedid in feedids
+        }
+
+        errors = {}
+        for feedid, future in futures.items():
+            try:
+                future.result()
+            except RhizomeHTTPStatusError as error:
+                errors[feedid] = error
+
+        if errors:
+            raise FeedBatchError(errors)
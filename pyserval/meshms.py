@@ -5,9 +5,18 @@ pyserval.meshms
 High level interface for meshms-messaging
 """
 
-import json
+import copy
 
-from pyserval.lowlevel.util import unmarshall
+from operator import attrgetter
+from time import monotonic
+
+from pyserval.lowlevel.util import (
+    decode_json,
+    iter_received,
+    stream_unmarshall,
+    unmarshall,
+)
+from pyserval.connection import ClosableInterface
 from pyserval.lowlevel.meshms import LowLevelMeshMS
 from pyserval.keyring import ServalIdentity
 from pyserval.exceptions import (
@@ -15,10 +24,27 @@ from pyserval.exceptions import (
     InvalidTokenError,
     RhizomeHTTPStatusError,
 )
-from typing import List, Union
+from typing import Dict, List, Tuple, Union
+
+_direction_and_read = attrgetter("type", "read")
 
-MESSAGELIST_HEADER_SIZE = 178
-MESSAGELIST_HEADER_NEWLINES = 5
+# time (in seconds) for which get_conversation reuses a fetched conversation list
+CONVERSATION_CACHE_TTL = 5.0
+
+
+def _as_sid(identity: Union[ServalIdentity, str], name: str = "identity") -> str:
+    """Returns the SID of a ServalIdentity, or the SID-string itself
+
+    Args:
+        identity (Union[ServalIdentity, str]): Identity to coerce
+        name (str): Name of the parameter, for the assertion-message
+
+    Returns:
+        str: SID of the identity
+    """
+    sid = getattr(identity, "sid", identity)
+    assert isinstance(sid, str), f"{name} has to be either a string or ServalIdentity"
+    return sid
 
 
 class Message:
@@ -51,6 +77,20 @@ class Message:
         ack_offset (int): (?)
     """
 
+    __slots__ = (
+        "type",
+        "my_sid",
+        "their_sid",
+        "my_offset",
+        "their_offset",
+        "token",
+        "text",
+        "delivered",
+        "read",
+        "timestamp",
+        "ack_offset",
+    )
+
     # TODO: Find the exact menaing of 'my' and 'their'
     def __init__(
         self,
@@ -78,11 +118,11 @@ class Message:
         self.timestamp = timestamp
         self.ack_offset = ack_offset
 
-    def __str__(self) -> str:
-        return str(self.__dict__)
-
     def __repr__(self) -> str:
-        return str(self.__dict__)
+        return (
+            f"Message(type={self.type!r}, my_sid={self.my_sid!r}, "
+            f"their_sid={self.their_sid!r}, timestamp={self.timestamp}, text={self.text!r})"
+        )
 
 
 class Conversation:
@@ -103,10 +143,25 @@ class Conversation:
         last_message (str): Content of the latest message (?)
         read_offset (int): Offset of the latest read message (?)
         _meshms (MeshMS): Interface for future Interactions
-        messages (List[Message]): Messages associated with this conversation
+        messages (Tuple[Message, ...]): Messages associated with this conversation
 
     """
 
+    __slots__ = (
+        "_id",
+        "my_sid",
+        "their_sid",
+        "read",
+        "last_message",
+        "read_offset",
+        "_meshms",
+        "messages",
+        "_messages_dirty",
+        "_received",
+        "_sent",
+        "_unread",
+    )
+
     def __init__(
         self,
         _id: str,
@@ -123,39 +178,89 @@ class Conversation:
         self.last_message = last_message
         self.read_offset = read_offset
         self._meshms = None
-        self.messages: List[Message] = []
-
-    def __str__(self) -> str:
-        return str(self.__dict__)
+        self.messages: Tuple[Message, ...] = ()
+        self._messages_dirty = True
+        self._received: Tuple[Message, ...] = ()
+        self._sent: Tuple[Message, ...] = ()
+        self._unread: Tuple[Message, ...] = ()
 
     def __repr__(self) -> str:
-        return str(self.__dict__)
+        return (
+            f"Conversation(my_sid={self.my_sid!r}, their_sid={self.their_sid!r}, "
+            f"read={self.read}, last_message={self.last_message!r})"
+        )
 
     def get_messages(self) -> None:
         """Update the message list"""
-        self.messages = self._meshms.message_list(
-            sender=self.my_sid, recipient=self.their_sid
+        self.messages = tuple(
+            self._meshms.message_list(sender=self.my_sid, recipient=self.their_sid)
         )
+        self._partition()
+        self._messages_dirty = False
+
+    def _partition(self) -> None:
+        """Sorts the messages into received, sent & unread in a single pass"""
+        received = []
+        sent = []
+        unread = []
+        for message in self.messages:
+            direction, read = _direction_and_read(message)
+            if direction == "<":
+                received.append(message)
+                if not read:
+                    unread.append(message)
+            elif direction == ">":
+                sent.append(message)
+        # the views are handed out directly, so they must not be modifiable by the caller
+        self._received = tuple(received)
+        self._sent = tuple(sent)
+        self._unread = tuple(unread)
+
+    def _refresh(self, refresh: bool) -> None:
+        if refresh or self._messages_dirty:
+            self.get_messages()
+
+    def received_messages(self, refresh: bool = False) -> Tuple[Message, ...]:
+        """Returns all messages received by this identity in this conversation
+
+        Args:
+            refresh (bool): Fetch the message list, even if it has already been fetched
+
+        Returns:
+            Tuple[Message, ...]: Received messages (a tuple, since it is shared by all callers)
+
+        Note:
+            Without refresh, the message list is only fetched if it has not been fetched yet,
+            or after sending a message
+        """
+        self._refresh(refresh)
+        return self._received
 
-    def received_messages(self) -> List[Message]:
-        """Returns all messages received by this identity in this conversation"""
-        self.get_messages()
-        received = [message for message in self.messages if message.type == "<"]
-        return received
+    def sent_messages(self, refresh: bool = False) -> Tuple[Message, ...]:
+        """Returns all messages sent by this identity in this conversation
 
-    def sent_messages(self) -> List[Message]:
-        """Returns all messages sent by this identity in this conversation"""
-        self.get_messages()
-        sent = [message for message in self.messages if message.type == ">"]
-        return sent
+        Args:
+            refresh (bool): See 'received_messages'
+
+        Returns:
+            Tuple[Message, ...]: Sent messages
+        """
+        self._refresh(refresh)
+        return self._sent
+
+    def unread(self, refresh: bool = False) -> Tuple[Message, ...]:
+        """Returns all received messages which have not been read yet
 
-    def unread(self) -> List[Message]:
-        """Returns all received messages which have not been read yet"""
+        Args:
+            refresh (bool): See 'received_messages'
+
+        Returns:
+            Tuple[Message, ...]: Unread messages
+        """
         # FIXME: serval seems to never update the 'read' field,
         #        even if there exists an ACK and the messages have been queried...
-        received = self.received_messages()
-        unread = [message for message in received if not message.read]
-        return unread
+        self._refresh(refresh)
+        return self._unread
 
     def send_message(self, message: str) -> None:
         """Sends a message to them
@@ -166,17 +271,24 @@ class Conversation:
         self._meshms.send_message(
             sender=self.my_sid, recipient=self.their_sid, message=message
         )
+        self._messages_dirty = True
 
 
-class MeshMS:
+class MeshMS(ClosableInterface):
     """Interface to send & receive meshms-messages
 
+    Can be used as a context-manager (see ClosableInterface)
+
     Args:
         low_level (LowLevelMeshMS): Interface for low level operations
     """
 
     def __init__(self, low_level: LowLevelMeshMS) -> None:
+        assert isinstance(low_level, LowLevelMeshMS)
+        ClosableInterface.__init__(self, low_level)
         self._low_level = low_level
+        # SID -> (time of the request, their_sid -> conversation)
+        self._conversation_cache: Dict[str, Tuple[float, Dict[str, Conversation]]] = {}
 
     def conversation_list(
         self, identity: Union[ServalIdentity, str]
@@ -190,12 +302,7 @@ class MeshMS:
             List[Conversation]: List of all the conversations
                                 that the specified identity is taking part in
         """
-        if isinstance(identity, ServalIdentity):
-            identity = identity.sid
-
-        assert isinstance(
-            identity, str
-        ), "identity has to be either a string or ServalIdentity"
+        identity = _as_sid(identity)
 
         result = self._low_level.conversation_list(identity)
 
@@ -204,11 +311,29 @@ class MeshMS:
         if result.status_code != 200:
             raise RhizomeHTTPStatusError(result)
 
-        conversations = unmarshall(json_table=result.json(), object_class=Conversation)
+        conversations = unmarshall(
+            json_table=decode_json(result), object_class=Conversation
+        )
         for conversation in conversations:
             conversation._meshms = self
+
+        self._conversation_cache[identity] = (
+            monotonic(),
+            {conversation.their_sid: conversation for conversation in conversations},
+        )
         return conversations
 
+    def invalidate_conversations(self, identity: Union[ServalIdentity, str]) -> None:
+        """Makes the next get_conversation-call fetch the conversation list of an identity
+
+        Only necessary if the list has changed without a message having been sent
+        through this object, e.g. by another client of the same serval-server
+
+        Args:
+            identity (Union[ServalIdentity, str])
+        """
+        self._conversation_cache.pop(_as_sid(identity), None)
+
     def get_conversation(
         self,
         identity: Union[ServalIdentity, str],
@@ -220,39 +345,67 @@ class MeshMS:
             identity (Union[ServalIdentity, str])
             other_identity (Union[ServalIdentity, str])
 
+        Note:
+            The conversation list of identity is reused for CONVERSATION_CACHE_TTL seconds,
+            unless a message has been sent from or to identity in the meantime.
+            If the conversation is not part of a reused list, it is fetched again
+
         Returns:
-            Conversation
+            Conversation: A copy of the cached conversation,
+                          so that callers (and threads) don't share its message lists
 
         Raises:
             ConversationNotFoundError: If no conversation between the two SIDs exists
         """
-        if isinstance(identity, ServalIdentity):
-            identity = identity.sid
-        if isinstance(other_identity, ServalIdentity):
-            other_identity = other_identity.sid
-
-        assert isinstance(
-            identity, str
-        ), "identity has to be either a string or ServalIdentity"
-        assert isinstance(
-            other_identity, str
-        ), "other_identity has to be either a string or ServalIdentity"
+        identity = _as_sid(identity)
+        other_identity = _as_sid(other_identity, "other_identity")
 
-        conversations = self.conversation_list(identity)
-        for conversation in conversations:
-            if conversation.their_sid == other_identity:
-                return conversation
+        cached = self._conversation_cache.get(identity)
+        if cached is not None and monotonic() - cached[0] < CONVERSATION_CACHE_TTL:
+            conversation = cached[1].get(other_identity)
+            if conversation is not None:
+                return copy.copy(conversation)
+
+        self.conversation_list(identity)
+        conversation = self._conversation_cache[identity][1].get(other_identity)
+        if conversation is not None:
+            return copy.copy(conversation)
 
         raise ConversationNotFoundError(sid=identity, other_sid=other_identity)
 
+    def prefetch_all_messages(
+        self, identity: Union[ServalIdentity, str]
+    ) -> List[Conversation]:
+        """Gets all conversations of an identity, together with their messages
+
+        The message lists are requested concurrently,
+        instead of one after another when first accessing each conversation
+
+        Args:
+            identity (Union[ServalIdentity, str])
+
+        Returns:
+            List[Conversation]: List of all the conversations
+                                that the specified identity is taking part in,
+                                with their messages already fetched
+
+        Raises:
+            RhizomeHTTPStatusError: If fetching any of the lists failed
+        """
+        conversations = self.conversation_list(identity)
+        # consume the results, so that errors are raised here
+        for _ in self._low_level.map(Conversation.get_messages, conversations):
+            pass
+        return conversations
+
     def message_list(
-        self, sender: ServalIdentity, recipient: ServalIdentity
+        self, sender: Union[ServalIdentity, str], recipient: Union[ServalIdentity, str],
     ) -> List[Message]:
         """Gets all the messages sent between two identities
 
         Args:
-            sender (ServalIdentity)
-            recipient (ServalIdentity)
+            sender (Union[ServalIdentity, str]): Either a ServalIdentity, or the SID of one
+            recipient (Union[ServalIdentity, str]): Either a ServalIdentity, or the SID of one
 
         Note:
             At least one of the identities needs to be local and unlocked
@@ -260,45 +413,48 @@ class MeshMS:
         Returns:
             List[Message]: List of all the messages sent between the two identities
         """
-        assert isinstance(sender, ServalIdentity)
-        assert isinstance(recipient, ServalIdentity)
+        sender = _as_sid(sender, "sender")
+        recipient = _as_sid(recipient, "recipient")
 
         # TODO: Is this one- or two-way?
-        result = self._low_level.message_list(
-            sender=sender.sid, recipient=recipient.sid
-        )
+        result = self._low_level.message_list(sender=sender, recipient=recipient)
 
         # I would like to make a better distinction here, but unfortunately the upstream docs
         # do not specify any status codes for specific errors
         if result.status_code != 200:
             raise RhizomeHTTPStatusError(result)
 
-        result_json = result.json()
+        result_json = decode_json(result)
         messages = unmarshall(json_table=result_json, object_class=Message)
         return messages
 
     def message_list_newsince(
-        self, sender: ServalIdentity, recipient: ServalIdentity, token: str
+        self,
+        sender: Union[ServalIdentity, str],
+        recipient: Union[ServalIdentity, str],
+        token: str,
     ) -> List[Message]:
-        """Gets all the messages sent between two identities since the token was generated
+        """Waits for the first message between two identities since the token was created
 
         Args:
-            sender (ServalIdentity)
-            recipient (ServalIdentity)
+            sender (Union[ServalIdentity, str]): Either a ServalIdentity, or the SID of one
+            recipient (Union[ServalIdentity, str]): Either a ServalIdentity, or the SID of one
             token (str)
 
         Note:
             At least one of the identities needs to be local and unlocked
 
         Returns:
-            List[Message]: List of all the messages sent between the two identities
+            List[Message]: The first message sent between the two identities
+                           since the token was generated,
+                           empty if the server closed the connection before one arrived
         """
-        assert isinstance(sender, ServalIdentity)
-        assert isinstance(recipient, ServalIdentity)
+        sender = _as_sid(sender, "sender")
+        recipient = _as_sid(recipient, "recipient")
         assert isinstance(token, str)
 
         with self._low_level.message_list_newsince(
-            sender=sender.sid, recipient=recipient.sid, token=token
+            sender=sender, recipient=recipient, token=token
         ) as serval_stream:
 
             if serval_stream.status_code == 404:
@@ -306,29 +462,12 @@ class MeshMS:
             if serval_stream.status_code != 200:
                 raise RhizomeHTTPStatusError(serval_stream)
 
-            serval_reply_bytes = []
-            lines = 0
-
-            for c in serval_stream.iter_content():
-                if c == b"\n":
-                    lines += 1
-
-                serval_reply_bytes.append(c)
-
-                if (
-                    c == b"]"
-                    and lines == MESSAGELIST_HEADER_NEWLINES
-                    and len(serval_reply_bytes) > MESSAGELIST_HEADER_SIZE
-                ):
-                    # complete json manually
-                    serval_reply_bytes += [b"\n", b"]", b"\n", b"}"]
-                    break
-
-            serval_reply = b"".join(serval_reply_bytes)
-            reply_json = json.loads(serval_reply)
-
-            messages = unmarshall(json_table=reply_json, object_class=Message)
-            return messages
+            # serval keeps the connection open until a new message arrives (or it times out),
+            # so only the first row is waited for
+            rows = stream_unmarshall(iter_received(serval_stream), object_class=Message)
+            for message in rows:
+                return [message]
+            return []
 
     def send_message(
         self,
@@ -343,18 +482,9 @@ class MeshMS:
             recipient (Union[ServalIdentity, str]): Either a ServalIdentity, or the SID of one
             message (str)
         """
-        if isinstance(sender, ServalIdentity):
-            sender = sender.sid
-        if isinstance(recipient, ServalIdentity):
-            recipient = recipient.sid
-
-        assert isinstance(
-            sender, str
-        ), "sender needs to be either a string or a ServalIdentity"
-        assert isinstance(
-            recipient, str
-        ), "recipient needs to be either a string or a ServalIdentity"
-        assert isinstance(message, str)
+        sender = _as_sid(sender, "sender")
+        recipient = _as_sid(recipient, "recipient")
+        assert isinstance(message, str), "message has to be a string"
         assert message, "message must be non-empty"
 
         result = self._low_level.send_message(
@@ -363,27 +493,30 @@ class MeshMS:
 
         # I would like to make a better distinction here, but unfortunately the upstream docs
         # do not specify any status codes for specific errors
-        if result.status_code != 200 and result.status_code != 201:
+        if result.status_code not in (200, 201):
             raise RhizomeHTTPStatusError(result)
 
+        # the conversation lists of both sides may have changed
+        self.invalidate_conversations(sender)
+        self.invalidate_conversations(recipient)
+
     def new_conversation(
-        self, identity: ServalIdentity, other_identity: ServalIdentity, message: str
+        self,
+        identity: Union[ServalIdentity, str],
+        other_identity: Union[ServalIdentity, str],
+        message: str,
     ) -> Conversation:
         """Establishes a new conversation between two identities
 
         Args:
-            identity (ServalIdentity)
-            other_identity (ServalIdentity)
+            identity (Union[ServalIdentity, str])
+            other_identity (Union[ServalIdentity, str])
             message (str)
 
         Returns:
             Conversation
         """
-        assert isinstance(identity, ServalIdentity)
-        assert isinstance(other_identity, ServalIdentity)
-        assert isinstance(message, str)
-        assert message, "message must be non-empty"
-
+        # the arguments are validated by send_message
         self.send_message(sender=identity, recipient=other_identity, message=message)
 
         return self.get_conversation(identity=identity, other_identity=other_identity)
@@ -6,10 +6,14 @@ This module contains the means to interact with rhizome, the serval distributed
 """
 
 import copy
-import json
 
+from collections import OrderedDict
+from itertools import islice
+from threading import Lock
+
+from pyserval.connection import ClosableInterface
 from pyserval.lowlevel.rhizome import LowLevelRhizome, Manifest
-from pyserval.lowlevel.util import decode_json_table
+from pyserval.lowlevel.util import decode_json, iter_received, stream_json_rows
 from pyserval.exceptions import (
     ManifestNotFoundError,
     PayloadNotFoundError,
@@ -22,11 +26,21 @@ from pyserval.exceptions import (
 )
 from pyserval.exceptions import InvalidTokenError, RhizomeHTTPStatusError
 from pyserval.keyring import Keyring, ServalIdentity
-from typing import Any, Union, Dict, List
+from typing import Any, Callable, Iterable, Iterator, Union, Dict, List, Tuple
 from requests.models import Response
 
+# the payload is streamed in chunks of this size (in bytes), see Rhizome.iter_payload
+PAYLOAD_CHUNK_SIZE = 64 * 1024
+
+# total size (in bytes) of the payloads kept by Rhizome.get_payload
+PAYLOAD_CACHE_SIZE = 32 * 1024 * 1024
+# larger payloads are not cached, so that a single one can't evict all others
+PAYLOAD_CACHE_MAX_ENTRY = 1024 * 1024
+# cached payloads are identified by bundle id, version, filehash & whether they are decrypted
+_PayloadKey = Tuple[str, Union[int, None], Union[str, None], bool]
 
-BUNDLELIST_HEADER_SIZE = 157
+# number of manifests kept for conditional requests, see Rhizome._get_manifest
+MANIFEST_CACHE_ENTRIES = 256
 
 
 class Bundle:
@@ -55,6 +69,18 @@ class Bundle:
         This allows the secret to be recovered if the identity's private key is accessible.
     """
 
+    __slots__ = (
+        "_rhizome",
+        "manifest",
+        "payload",
+        "bundle_id",
+        "bundle_author",
+        "bundle_secret",
+        "from_here",
+        "complete",
+        "token",
+    )
+
     def __init__(
         self,
         rhizome,
@@ -78,7 +104,10 @@ class Bundle:
         self.token = token
 
     def __repr__(self) -> str:
-        return f"Bundle({repr(self.__dict__)})"
+        return (
+            f"Bundle(bundle_id={self.bundle_id!r}, bundle_author={self.bundle_author!r}, "
+            f"from_here={self.from_here}, complete={self.complete}, manifest={self.manifest!r})"
+        )
 
     def __eq__(self, other: Any) -> bool:
         if not isinstance(other, Bundle):
@@ -193,6 +222,18 @@ class Journal:
             This allows the secret to be recovered if the identity's private key is accessible.
         """
 
+    __slots__ = (
+        "_rhizome",
+        "manifest",
+        "payload",
+        "bundle_id",
+        "bundle_author",
+        "bundle_secret",
+        "from_here",
+        "complete",
+        "token",
+    )
+
     def __init__(
         self,
         rhizome,
@@ -216,7 +257,10 @@ class Journal:
         self.token = token
 
     def __repr__(self) -> str:
-        return f"Journal({repr(self.__dict__)})"
+        return (
+            f"Journal(bundle_id={self.bundle_id!r}, bundle_author={self.bundle_author!r}, "
+            f"from_here={self.from_here}, complete={self.complete}, manifest={self.manifest!r})"
+        )
 
     def __eq__(self, other: Any) -> bool:
         if not isinstance(other, Journal):
@@ -327,9 +371,11 @@ def _handle_bundle_error(serval_reply: Response) -> None:
         )
 
 
-class Rhizome:
+class Rhizome(ClosableInterface):
     """Interface for interacting with the serval rhizome API
 
+    Can be used as a context-manager (see ClosableInterface)
+
     Args:
         low_level_rhizome (LowLevelRhizome): Used to perform low level requests
         keyring (Keyring): Bundles can be associated with identities
@@ -338,69 +384,92 @@ class Rhizome:
     def __init__(self, low_level_rhizome: LowLevelRhizome, keyring: Keyring) -> None:
         assert isinstance(low_level_rhizome, LowLevelRhizome)
         assert isinstance(keyring, Keyring)
+        ClosableInterface.__init__(self, low_level_rhizome)
         self._low_level_rhizome = low_level_rhizome
         self._keyring = keyring
+        # (bundle id, version, filehash, decrypted) -> payload, least recently used first
+        self._payload_cache: "OrderedDict[_PayloadKey, bytes]" = OrderedDict()
+        self._payload_cache_size = 0
+        self._payload_cache_lock = Lock()
+        # bundle id -> (ETag, manifest), least recently used first
+        self._manifest_cache: "OrderedDict[str, Tuple[str, Manifest]]" = OrderedDict()
+        self._manifest_cache_lock = Lock()
 
-    def _parse_bundlelist(
-        self, reply_json: Dict[str, List[Union[str, List[str]]]]
-    ) -> List[Union[Bundle, Journal]]:
-        bundle_data = decode_json_table(reply_json)
-        bundles = []
+    def _bundle_builder(
+        self, header: List[str]
+    ) -> Callable[[List[Any]], Union[Bundle, Journal]]:
+        """Creates a function which builds (partial) Bundles/Journals from bundlelist-rows
 
-        for data in bundle_data:
-            manifest = Manifest()
-            # take only those values from data which belong into the manifest
-            manifest_data = {
-                key: value
-                for (key, value) in data.items()
-                if key in manifest.__dict__.keys()
-            }
-
-            manifest.__dict__.update(**manifest_data)
-
-            if manifest.tail is None:
-                new_bundle = Bundle(
-                    self,
-                    manifest=manifest,
-                    bundle_id=data["id"],
-                    from_here=data[".fromhere"],
-                    token=data[".token"],
-                )
-            else:
-                new_bundle = Journal(
-                    self,
-                    manifest=manifest,
-                    bundle_id=data["id"],
-                    from_here=data[".fromhere"],
-                    token=data[".token"],
-                )
+        The columns are looked up once per table, so the rows never have to be turned into dicts
+
+        Args:
+            header (List[str]): Header of the bundlelist
+
+        Returns:
+            Callable[[List[Any]], Union[Bundle, Journal]]: Takes a row, returns the bundle
+        """
+        columns = {name: index for index, name in enumerate(header)}
+        # take only those values from the row which belong into the manifest
+        manifest_columns = [columns.get(field) for field in Manifest.FIELDS]
+        id_column = columns["id"]
+        author_column = columns[".author"]
+        from_here_column = columns[".fromhere"]
+        token_column = columns[".token"]
+
+        def build(row: List[Any]) -> Union[Bundle, Journal]:
+            manifest = Manifest.from_values(
+                [None if index is None else row[index] for index in manifest_columns]
+            )
 
-            if data[".author"] is not None:
-                new_bundle.bundle_author = data[".author"]
+            bundle_class = Bundle if manifest.tail is None else Journal
+            author = row[author_column]
+            return bundle_class(
+                self,
+                manifest=manifest,
+                bundle_id=row[id_column],
+                bundle_author="" if author is None else author,
+                from_here=row[from_here_column],
+                token=row[token_column],
+            )
 
-            bundles.append(new_bundle)
+        return build
 
-        return bundles
+    def _parse_bundlelist(
+        self, reply_json: Dict[str, List[Union[str, List[str]]]]
+    ) -> List[Union[Bundle, Journal]]:
+        build = self._bundle_builder(reply_json["header"])
+        return [build(row) for row in reply_json["rows"]]
 
     def get_bundlelist(self) -> List[Union[Bundle, Journal]]:
         """Get list of all bundles in the rhizome store
 
         Returns:
             List[Union[Bundle, Journal]]
+
+        Raises:
+            RhizomeHTTPStatusError: If the HTTP status code is unknown
         """
         serval_reply = self._low_level_rhizome.get_manifests()
-        reply_json = serval_reply.json()
+
+        # check the status first, so that error-responses are not decoded as a table
+        if serval_reply.status_code != 200:
+            raise RhizomeHTTPStatusError(serval_reply)
+
+        reply_json = decode_json(serval_reply)
 
         return self._parse_bundlelist(reply_json)
 
-    def get_bundlelist_newsince(self, token: str) -> List[Union[Bundle, Journal]]:
-        """Get list of the bundles added after a specific token
+    def iter_bundlelist_newsince(self, token: str) -> Iterator[Union[Bundle, Journal]]:
+        """Get the bundles added after a specific token, as soon as they arrive
+
+        The server keeps the connection open (until it times out) and sends new bundles
+        as they are added to the store, each of which is yielded immediately
 
         Args:
             token (str): NewSince Token
 
-        Returns:
-            List[Union[Bundle, Journal]]
+        Yields:
+            Union[Bundle, Journal]
 
         Raises:
             InvalidTokenError: If the token is not found in serval
@@ -412,28 +481,33 @@ class Rhizome:
             if serval_stream.status_code != 200:
                 raise RhizomeHTTPStatusError(serval_stream)
 
-            serval_reply_bytes = []
-            lines = 0
+            build = None
+            for header, row in stream_json_rows(iter_received(serval_stream)):
+                if build is None:
+                    build = self._bundle_builder(header)
+                yield build(row)
 
-            for c in serval_stream.iter_content():
-                if c == b"\n":
-                    lines += 1
+    def get_bundlelist_newsince(self, token: str) -> List[Union[Bundle, Journal]]:
+        """Get list of the bundles added after a specific token
 
-                serval_reply_bytes.append(c)
+        Blocks until the first new bundle arrives (or the server times out)
 
-                if (
-                    c == b"]"
-                    and lines == 3
-                    and len(serval_reply_bytes) > BUNDLELIST_HEADER_SIZE
-                ):
-                    # complete json manually
-                    serval_reply_bytes += [b"\n", b"]", b"\n", b"}"]
-                    break
+        Args:
+            token (str): NewSince Token
 
-        serval_reply = b"".join(serval_reply_bytes)
-        reply_json = json.loads(serval_reply)
+        Returns:
+            List[Union[Bundle, Journal]]: The first new bundle (empty on timeout)
 
-        return self._parse_bundlelist(reply_json)
+        Raises:
+            InvalidTokenError: If the token is not found in serval
+            RhizomeHTTPStatusError: If the HTTP status code is unknown
+        """
+        bundles = self.iter_bundlelist_newsince(token)
+        try:
+            return list(islice(bundles, 1))
+        finally:
+            # closes the connection instead of waiting for further bundles
+            bundles.close()
 
     def _get_manifest(self, bid: str) -> Manifest:
         """Get only the manifest for a specific BID
@@ -446,19 +520,46 @@ class Rhizome:
 
         Raises:
             NoSuchIdentityException: If no bundle with the specified BID is available
+
+        Note:
+            If the server sent an ETag with the manifest, the parsed manifest is kept
+            and later requests for the same BID are conditional,
+            so an unchanged manifest is neither sent nor parsed again
         """
         assert isinstance(bid, str)
 
-        serval_reply = self._low_level_rhizome.get_manifest(bid=bid)
+        with self._manifest_cache_lock:
+            cached = self._manifest_cache.get(bid)
+
+        serval_reply = self._low_level_rhizome.get_manifest(
+            bid=bid, etag=None if cached is None else cached[0]
+        )
 
         if serval_reply.status_code == 404:
+            with self._manifest_cache_lock:
+                self._manifest_cache.pop(bid, None)
             raise ManifestNotFoundError(bid)
 
+        if serval_reply.status_code == 304 and cached is not None:
+            with self._manifest_cache_lock:
+                if bid in self._manifest_cache:
+                    self._manifest_cache.move_to_end(bid)
+            # manifests are mutable, the cached one must not be shared with the caller
+            return copy.copy(cached[1])
+
         reply_text = serval_reply.text
 
         manifest = Manifest()
         manifest.update(reply_text)
 
+        etag = serval_reply.headers.get("ETag")
+        if etag is not None:
+            with self._manifest_cache_lock:
+                self._manifest_cache[bid] = (etag, copy.copy(manifest))
+                self._manifest_cache.move_to_end(bid)
+                if len(self._manifest_cache) > MANIFEST_CACHE_ENTRIES:
+                    self._manifest_cache.popitem(last=False)
+
         return manifest
 
     def get_bundle(self, bid: str) -> Union[Bundle, Journal]:
@@ -473,18 +574,51 @@ class Rhizome:
         Raises:
             NoSuchIdentityException: If no bundle with the specified BID is available
         """
-        manifest = self._get_manifest(bid)
+        return self._fetch_bundle(bid, include_payload=True)
 
-        if manifest.tail is None:
-            bundle = Bundle(
-                self, manifest=manifest, bundle_id=manifest.id, complete=True
-            )
-        else:
-            bundle = Journal(
-                self, manifest=manifest, bundle_id=manifest.id, complete=True
+    def get_bundles(
+        self, bids: Iterable[str], include_payload: bool = False
+    ) -> List[Union[Bundle, Journal]]:
+        """Get the bundles for multiple BIDs, requesting them concurrently
+
+        Args:
+            bids (Iterable[str]): Bundle IDs
+            include_payload (bool): Also fetch the payloads (as get_bundle does)
+                                    If unset, only the manifests are fetched
+                                    and the bundles are not complete
+
+        Returns:
+            List[Union[Bundle, Journal]]: The bundles, in the order of bids
+
+        Raises:
+            ManifestNotFoundError: If any of the bundles is not available
+        """
+        return list(
+            self._low_level_rhizome.map(
+                lambda bid: self._fetch_bundle(bid, include_payload=include_payload),
+                bids,
             )
+        )
+
+    def _fetch_bundle(self, bid: str, include_payload: bool) -> Union[Bundle, Journal]:
+        """Get the bundle for a specific BID, with or without its payload
+
+        Args:
+            bid (str): Bundle ID
+            include_payload (bool): Also fetch the payload, making the bundle complete
 
-        bundle.get_payload()
+        Returns:
+            Union[Bundle, Journal]
+        """
+        manifest = self._get_manifest(bid)
+
+        bundle_class = Bundle if manifest.tail is None else Journal
+        bundle = bundle_class(
+            self, manifest=manifest, bundle_id=manifest.id, complete=include_payload
+        )
+
+        if include_payload:
+            bundle.get_payload()
         return bundle
 
     def get_payload(
@@ -495,67 +629,174 @@ class Rhizome:
         Args:
             bundle (Union[Bundle, Journal]): Bundle/Journal object
             decode (bool): Set, if payload is utf-8 encoded string (if your original payload was a string and not bytes)
+                           Invalid UTF-8 sequences are replaced with U+FFFD
                            If unset, returns raw bytes
 
         Returns:
             Union[bytes, str]: Payload of the bundle
 
         Note:
+            Payloads (up to PAYLOAD_CACHE_MAX_ENTRY bytes) are cached per bundle version & filehash,
+            so fetching the payload of the same manifest again does not need another request
+            (raw and decrypted payloads are cached separately)
+
             For documentation on possible status code combinations, see
             https://github.com/servalproject/serval-dna/blob/development/doc/REST-API-Rhizome.md#get-restfulrhizomebidrawbin
         """
         assert isinstance(bundle, Bundle) or isinstance(bundle, Journal)
 
-        if bundle.manifest.crypt == 1:
-            serval_reply = self._low_level_rhizome.get_decrypted(bundle.bundle_id)
-
-            if serval_reply.status_code == 200:
-                if decode:
-                    return serval_reply.text
-                else:
-                    return serval_reply.content
-
-            elif serval_reply.status_code == 404:
-                bundle_status = serval_reply.headers.get(
-                    "Serval-Rhizome-Result-Bundle-Status-Code"
-                )
-                payload_status = serval_reply.headers.get(
-                    "Serval-Rhizome-Result-Payload-Status-Code"
-                )
-
-                if bundle_status == "0":
-                    raise ManifestNotFoundError(bid=bundle.bundle_id)
-                elif bundle_status == "1" and payload_status == "1":
-                    raise PayloadNotFoundError(bid=bundle.bundle_id)
-                else:
-                    raise UnknownRhizomeStatusError(serval_response=serval_reply)
-
-            elif serval_reply.status_code == 419:
-                raise DecryptionError(bid=bundle.bundle_id)
+        manifest = bundle.manifest
+        decrypted = manifest.crypt == 1
+        payload = self._cached_payload(
+            (bundle.bundle_id, manifest.version, manifest.filehash, decrypted)
+        )
+
+        if payload is None:
+            if decrypted:
+                serval_reply = self._low_level_rhizome.get_decrypted(bundle.bundle_id)
+            else:
+                serval_reply = self._low_level_rhizome.get_raw(bundle.bundle_id)
+
+            if serval_reply.status_code != 200:
+                self._raise_payload_error(bundle, serval_reply)
+
+            payload = serval_reply.content
+            self._cache_payload(
+                self._received_payload_key(bundle, serval_reply, decrypted), payload
+            )
+
+        if decode:
+            return payload.decode("utf-8", errors="replace")
+        return payload
+
+    @staticmethod
+    def _received_payload_key(
+        bundle: Union[Bundle, Journal], serval_reply: Response, decrypted: bool
+    ) -> _PayloadKey:
+        """Gets the cache-key of a received payload from the headers of the response
+
+        The server always sends the payload of its current version, which is not necessarily
+        the one described by the (possibly outdated) manifest of the bundle-object
+
+        Args:
+            bundle (Union[Bundle, Journal]): Bundle/Journal object
+            serval_reply (requests.models.Response): Successful raw.bin/decrypted.bin-response
+            decrypted (bool): Whether the payload has been received from decrypted.bin
+
+        Returns:
+            _PayloadKey: Bundle ID, version, filehash & whether the payload is decrypted
+        """
+        version = serval_reply.headers.get("Serval-Rhizome-Bundle-Version")
+        if version is not None:
+            version = int(version)
+
+        filehash = serval_reply.headers.get("Serval-Rhizome-Bundle-Filehash")
+        if filehash is None and version == bundle.manifest.version:
+            filehash = bundle.manifest.filehash
+
+        return bundle.bundle_id, version, filehash, decrypted
+
+    def _cached_payload(self, key: _PayloadKey) -> Union[bytes, None]:
+        """Gets a payload from the cache, marking it as recently used
+
+        Args:
+            key (_PayloadKey): Bundle ID, version, filehash & whether the payload is decrypted
+
+        Returns:
+            Union[bytes, None]: The cached payload, None if it is not cached
+        """
+        with self._payload_cache_lock:
+            payload = self._payload_cache.get(key)
+            if payload is not None:
+                self._payload_cache.move_to_end(key)
+            return payload
+
+    def _cache_payload(self, key: _PayloadKey, payload: bytes) -> None:
+        """Adds a payload to the cache, evicting the least recently used ones if necessary
 
+        Args:
+            key (_PayloadKey): Bundle ID, version, filehash & whether the payload is decrypted
+            payload (bytes): Payload of this version of the bundle
+        """
+        # without a version & filehash, the key does not identify the payload
+        # (e.g. journals keep their version when the start of their payload is dropped)
+        if key[1] is None or not key[2] or len(payload) > PAYLOAD_CACHE_MAX_ENTRY:
+            return
+
+        with self._payload_cache_lock:
+            previous = self._payload_cache.pop(key, None)
+            if previous is not None:
+                self._payload_cache_size -= len(previous)
+
+            self._payload_cache[key] = payload
+            self._payload_cache_size += len(payload)
+
+            while self._payload_cache_size > PAYLOAD_CACHE_SIZE:
+                _, evicted = self._payload_cache.popitem(last=False)
+                self._payload_cache_size -= len(evicted)
+
+    def iter_payload(
+        self, bundle: Union[Bundle, Journal], chunk_size: int = PAYLOAD_CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        """Get the payload for a bundle piece by piece, while it is being received
+
+        Unlike get_payload, this never holds more than a single chunk of the payload in memory
+
+        Args:
+            bundle (Union[Bundle, Journal]): Bundle/Journal object
+            chunk_size (int): Maximum size (in bytes) of the yielded chunks
+
+        Yields:
+            bytes: Next chunk of the (raw) payload
+        """
+        assert isinstance(bundle, Bundle) or isinstance(bundle, Journal)
+
+        if bundle.manifest.crypt == 1:
+            serval_stream = self._low_level_rhizome.get_decrypted(
+                bundle.bundle_id, stream=True
+            )
         else:
-            serval_reply = self._low_level_rhizome.get_raw(bundle.bundle_id)
-
-            if serval_reply.status_code == 200:
-                if decode:
-                    return serval_reply.text
-                else:
-                    return serval_reply.content
-
-            elif serval_reply.status_code == 404:
-                bundle_status = serval_reply.headers.get(
-                    "Serval-Rhizome-Result-Bundle-Status-Code"
-                )
-                payload_status = serval_reply.headers.get(
-                    "Serval-Rhizome-Result-Payload-Status-Code"
-                )
-
-                if bundle_status == "0":
-                    raise ManifestNotFoundError(bid=bundle.bundle_id)
-                elif bundle_status == "1" and payload_status == "1":
-                    raise PayloadNotFoundError(bid=bundle.bundle_id)
-                else:
-                    raise UnknownRhizomeStatusError(serval_response=serval_reply)
+            serval_stream = self._low_level_rhizome.get_raw(
+                bundle.bundle_id, stream=True
+            )
+
+        with serval_stream:
+            if serval_stream.status_code != 200:
+                self._raise_payload_error(bundle, serval_stream)
+
+            yield from serval_stream.iter_content(chunk_size=chunk_size)
+
+    @staticmethod
+    def _raise_payload_error(
+        bundle: Union[Bundle, Journal], serval_reply: Response
+    ) -> None:
+        """Raises the error matching an unsuccessful raw.bin/decrypted.bin-request
+
+        Args:
+            bundle (Union[Bundle, Journal]): Bundle/Journal object
+            serval_reply (requests.models.Response): Response returned by the serval-server
+
+        Raises:
+            ManifestNotFoundError: If the bundle is not in the store
+            PayloadNotFoundError: If the bundle's payload is not in the store
+            DecryptionError: If the payload can't be decrypted
+            UnknownRhizomeStatusError: For any other status code combination
+        """
+        if serval_reply.status_code == 404:
+            bundle_status = serval_reply.headers.get(
+                "Serval-Rhizome-Result-Bundle-Status-Code"
+            )
+            payload_status = serval_reply.headers.get(
+                "Serval-Rhizome-Result-Payload-Status-Code"
+            )
+
+            if bundle_status == "0":
+                raise ManifestNotFoundError(bid=bundle.bundle_id)
+            elif bundle_status == "1" and payload_status == "1":
+                raise PayloadNotFoundError(bid=bundle.bundle_id)
+
+        elif serval_reply.status_code == 419:
+            raise DecryptionError(bid=bundle.bundle_id)
 
         # if we don't recognise the status code combination, raise the appropriate error
         raise UnknownRhizomeStatusError(serval_response=serval_reply)
@@ -5,8 +5,9 @@ pyserval.route
 This module contains the means to interact with servald's routing-interface
 """
 
+from pyserval.exceptions import RhizomeHTTPStatusError
 from pyserval.lowlevel.route import LowLevelRoute
-from pyserval.lowlevel.util import unmarshall
+from pyserval.lowlevel.util import decode_json, unmarshall
 from typing import Union, List
 
 
@@ -73,9 +74,17 @@ class Route:
 
         Returns:
             List[Peer]: List of peer-object containing metadata of all known peers
+
+        Raises:
+            RhizomeHTTPStatusError: If the HTTP status code is unknown
         """
         serval_response = self._route.get_all()
-        response_json = serval_response.json()
+
+        # check the status first, so that error-responses are not decoded as a table
+        if serval_response.status_code != 200:
+            raise RhizomeHTTPStatusError(serval_response)
+
+        response_json = decode_json(serval_response)
 
         peers = unmarshall(json_table=response_json, object_class=Peer, _route=self)
 
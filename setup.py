@@ -18,6 +18,8 @@ with open(path.join(here, "README.md"), encoding="utf-8") as f:
 
 dependencies = ["requests"]
 
+optional_dependencies = {"fast": ["orjson"]}
+
 setup(
     name="pyserval",
     version="0.5",
@@ -37,7 +39,9 @@ setup(
     keywords="serval dtn",
     license="MIT",
     packages=find_packages(exclude=["docs", "tests", "examples"]),
+    python_requires=">=3.6",
     install_requires=dependencies,
+    extras_require=optional_dependencies,
     zip_safe=True,
     project_urls={
         "Bug Reports": "https://github.com/umr-ds/pyserval/issues",
@@ -0,0 +1,180 @@
+"""Low level interfaces which answer from memory instead of a serval-server"""
+
+import json
+
+from hashlib import sha1
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+from pyserval.lowlevel.connection import RestfulConnection
+from pyserval.lowlevel.meshmb import LowLevelMeshMB
+from pyserval.lowlevel.meshms import LowLevelMeshMS
+from pyserval.lowlevel.rhizome import LowLevelRhizome, Manifest
+
+
+def make_response(status_code, content=b"", headers=None):
+    """Creates a (complete) response, as returned by RestfulConnection
+
+    Args:
+        status_code (int): HTTP status code
+        content (Union[bytes, dict]): Body of the response, dicts are encoded as JSON
+        headers (dict): HTTP-headers of the response
+
+    Returns:
+        requests.models.Response: The response
+    """
+    if isinstance(content, dict):
+        content = json.dumps(content).encode("utf-8")
+
+    response = Response()
+    response.status_code = status_code
+    response._content = content
+    response.encoding = "utf-8"
+    response.headers = CaseInsensitiveDict(headers or {})
+    return response
+
+
+class StubLowLevelMeshMB(LowLevelMeshMB):
+    """Accepts every follow-request, except for the given feeds
+
+    Attributes:
+        failing (Dict[str, int]): Feed ID -> HTTP status code returned for it
+        followed (Set[str]): Feed IDs which have been followed successfully
+    """
+
+    def __init__(self):
+        LowLevelMeshMB.__init__(self, RestfulConnection())
+        self.failing = {}
+        self.followed = set()
+
+    def follow_feed(self, identity, feedid):
+        status_code = self.failing.get(feedid)
+        if status_code is not None:
+            return make_response(status_code, {"http_status_code": status_code})
+
+        self.followed.add(feedid)
+        return make_response(200, {"http_status_code": 200})
+
+
+class StubLowLevelMeshMS(LowLevelMeshMS):
+    """Serves conversation lists from memory, counting the requests
+
+    Attributes:
+        conversations (Dict[str, List[str]]): SID -> SIDs of the other participants
+        requests (int): Number of conversation list requests
+    """
+
+    def __init__(self):
+        LowLevelMeshMS.__init__(self, RestfulConnection())
+        self.conversations = {}
+        self.requests = 0
+
+    def conversation_list(self, sid):
+        self.requests += 1
+
+        header = ["_id", "my_sid", "their_sid", "read", "last_message", "read_offset"]
+        rows = [
+            [index, sid, their_sid, True, 0, 0]
+            for index, their_sid in enumerate(self.conversations.get(sid, []))
+        ]
+        return make_response(200, {"header": header, "rows": rows})
+
+
+# columns of serval's bundlelist.json (which has no 'crypt'-column)
+BUNDLELIST_HEADER = [
+    ".token",
+    "_id",
+    "service",
+    "id",
+    "version",
+    "date",
+    ".inserttime",
+    ".author",
+    ".fromhere",
+    "filesize",
+    "filehash",
+    "sender",
+    "recipient",
+    "name",
+]
+
+
+class StubLowLevelRhizome(LowLevelRhizome):
+    """Serves manifests & payloads from memory, recording all requests
+
+    Attributes:
+        manifests (Dict[str, str]): Bundle ID -> manifest in text+binarysig format
+        payloads (Dict[str, Tuple[int, str, bytes]]): Bundle ID -> (version, filehash, payload)
+        decrypted (Dict[str, bytes]): Bundle ID -> decrypted payload,
+                                      decrypted.bin fails with 419 for other bundles
+        requests (List[Tuple[str, str]]): (endpoint, Bundle ID)
+        etags (List[Union[str, None]]): ETags sent with the manifest-requests
+    """
+
+    def __init__(self):
+        LowLevelRhizome.__init__(self, RestfulConnection())
+        self.manifests = {}
+        self.payloads = {}
+        self.decrypted = {}
+        self.requests = []
+        self.etags = []
+
+    def get_manifests(self):
+        self.requests.append(("bundlelist", None))
+
+        rows = []
+        for text in self.manifests.values():
+            manifest = Manifest()
+            manifest.update(text)
+            rows.append(
+                [
+                    None if column.startswith(".") else getattr(manifest, column, None)
+                    for column in BUNDLELIST_HEADER
+                ]
+            )
+        return make_response(200, {"header": BUNDLELIST_HEADER, "rows": rows})
+
+    def etag(self, bid):
+        """ETag of the current manifest of a bundle
+
+        Args:
+            bid (str): Bundle ID
+
+        Returns:
+            str: Quoted hash of the manifest
+        """
+        return '"' + sha1(self.manifests[bid].encode("utf-8")).hexdigest() + '"'
+
+    def get_manifest(self, bid, etag=None):
+        self.requests.append(("manifest", bid))
+        self.etags.append(etag)
+
+        if bid not in self.manifests:
+            return make_response(404, {"http_status_code": 404})
+        if etag == self.etag(bid):
+            return make_response(304)
+        return make_response(
+            200, self.manifests[bid].encode("utf-8"), {"ETag": self.etag(bid)}
+        )
+
+    def get_raw(self, bid, stream=False):
+        self.requests.append(("raw", bid))
+        return self._payload_response(bid, self.payloads[bid][2])
+
+    def get_decrypted(self, bid, stream=False):
+        self.requests.append(("decrypted", bid))
+        if bid not in self.decrypted:
+            return make_response(419, {"http_status_code": 419})
+        return self._payload_response(bid, self.decrypted[bid])
+
+    def _payload_response(self, bid, payload):
+        version, filehash, _ = self.payloads[bid]
+        return make_response(
+            200,
+            payload,
+            {
+                "Serval-Rhizome-Bundle-Version": str(version),
+                "Serval-Rhizome-Bundle-Filehash": filehash,
+            },
+        )
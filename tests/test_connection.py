@@ -0,0 +1,53 @@
+"""Tests for pyserval.lowlevel.connection"""
+
+from threading import Barrier, Thread
+
+import pytest
+
+from pyserval.exceptions import ConnectionClosedError
+from pyserval.lowlevel.connection import RestfulConnection
+
+
+def test_submit_and_map():
+    connection = RestfulConnection()
+
+    assert connection.submit(sum, [1, 2]).result() == 3
+    assert list(connection.map(sum, [[1], [1, 2]])) == [1, 3]
+
+
+def test_closed_connection_rejects_submissions():
+    connection = RestfulConnection()
+    connection.submit(sum, [1, 2]).result()
+    connection.close()
+
+    with pytest.raises(ConnectionClosedError):
+        connection.submit(sum, [1, 2])
+    with pytest.raises(ConnectionClosedError):
+        connection.map(sum, [[1]])
+
+
+def test_close_during_submissions():
+    """Submitting concurrently with close either succeeds or raises ConnectionClosedError"""
+    connection = RestfulConnection()
+    barrier = Barrier(5)
+    errors = []
+
+    def submit_until_closed():
+        barrier.wait()
+        try:
+            while True:
+                connection.submit(sum, [1, 2])
+        except ConnectionClosedError:
+            pass
+        except Exception as error:
+            errors.append(error)
+
+    threads = [Thread(target=submit_until_closed) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    connection.close()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
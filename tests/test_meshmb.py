@@ -1,8 +1,13 @@
 """Tests for pyserval.meshmb"""
 
+import pytest
 from hypothesis import given
 
+from pyserval.exceptions import FeedBatchError, RhizomeHTTPStatusError
+from pyserval.meshmb import MeshMB
+
 from tests.custom_strategies import unicode_printable
+from tests.stubs import StubLowLevelMeshMB
 
 
 @given(payload=unicode_printable)
@@ -27,3 +32,43 @@ def test_send_message(serval_init, payload):
                 break
 
         assert present
+
+
+def test_follow_feeds(serval_init):
+    identity, *others = serval_init.keyring.get_or_create(3)
+    meshmb = serval_init.meshmb
+
+    # a feed only exists once its author has sent a message
+    for other in others:
+        meshmb.send_message(identity=other, message="Hello")
+
+    meshmb.follow_feeds(identity=identity, feedids=[o.identity for o in others])
+
+    followed = [feed.id for feed in meshmb.get_feedlist(identity=identity)]
+    for other in others:
+        assert other.identity in followed
+
+
+def test_follow_feeds_aggregates_errors():
+    low_level = StubLowLevelMeshMB()
+    low_level.failing = {"B": 404, "D": 500}
+    meshmb = MeshMB(low_level)
+
+    with pytest.raises(FeedBatchError) as excinfo:
+        meshmb.follow_feeds("0" * 64, ["A", "B", "C", "D"])
+
+    errors = excinfo.value.errors
+    assert sorted(errors) == ["B", "D"]
+    assert all(isinstance(error, RhizomeHTTPStatusError) for error in errors.values())
+    assert errors["B"].http_status == 404
+    assert errors["D"].http_status == 500
+    assert str(excinfo.value) == "Failed for 2 feed(s): B, D"
+    # all requests are sent, regardless of the failures
+    assert low_level.followed == {"A", "C"}
+
+
+def test_follow_feeds_success():
+    low_level = StubLowLevelMeshMB()
+    MeshMB(low_level).follow_feeds("0" * 64, ["A", "B"])
+
+    assert low_level.followed == {"A", "B"}
@@ -1,8 +1,14 @@
 """Tests for pyserval.meshms"""
 
+import pytest
 from hypothesis import given
 
+import pyserval.meshms
+from pyserval.exceptions import ConversationNotFoundError
+from pyserval.meshms import CONVERSATION_CACHE_TTL, MeshMS
+
 from tests.custom_strategies import unicode_printable
+from tests.stubs import StubLowLevelMeshMS
 
 
 @given(payload=unicode_printable)
@@ -31,3 +37,79 @@ def test_send_message(serval_init, payload):
                 break
 
         assert present
+
+
+SID_A = "A" * 64
+SID_B = "B" * 64
+SID_C = "C" * 64
+
+
+class Clock:
+    """Replacement for time.monotonic, which only advances when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def stub_meshms(monkeypatch):
+    """MeshMS-interface which is served by StubLowLevelMeshMS, with a controllable clock
+
+    Yields:
+        Tuple[MeshMS, StubLowLevelMeshMS, Clock]: Interface, its low level stub & the clock
+    """
+    clock = Clock()
+    monkeypatch.setattr(pyserval.meshms, "monotonic", clock)
+    low_level = StubLowLevelMeshMS()
+    low_level.conversations[SID_A] = [SID_B]
+    yield MeshMS(low_level), low_level, clock
+
+
+def test_get_conversation_reuses_list(stub_meshms):
+    meshms, low_level, clock = stub_meshms
+
+    conversation = meshms.get_conversation(SID_A, SID_B)
+    clock.now += CONVERSATION_CACHE_TTL / 2
+    reused = meshms.get_conversation(SID_A, SID_B)
+
+    assert low_level.requests == 1
+    assert reused.their_sid == conversation.their_sid
+    assert reused._meshms is meshms
+    # every caller gets its own copy, so they don't share mutable state
+    assert reused is not conversation
+
+
+def test_get_conversation_expires(stub_meshms):
+    meshms, low_level, clock = stub_meshms
+
+    conversation = meshms.get_conversation(SID_A, SID_B)
+    clock.now += CONVERSATION_CACHE_TTL
+
+    assert meshms.get_conversation(SID_A, SID_B) is not conversation
+    assert low_level.requests == 2
+
+
+def test_get_conversation_unknown_refetches(stub_meshms):
+    meshms, low_level, clock = stub_meshms
+    meshms.get_conversation(SID_A, SID_B)
+
+    # a conversation which is not part of the cached list may have been started since
+    low_level.conversations[SID_A].append(SID_C)
+    assert meshms.get_conversation(SID_A, SID_C).their_sid == SID_C
+    assert low_level.requests == 2
+
+    with pytest.raises(ConversationNotFoundError):
+        meshms.get_conversation(SID_B, SID_A)
+
+
+def test_invalidate_conversations(stub_meshms):
+    meshms, low_level, clock = stub_meshms
+    meshms.get_conversation(SID_A, SID_B)
+
+    meshms.invalidate_conversations(SID_A)
+    meshms.get_conversation(SID_A, SID_B)
+
+    assert low_level.requests == 2
@@ -1,9 +1,21 @@
 """Tests for pyserval.rhizome"""
 
+import pytest
+
+import pyserval.rhizome
 from pyserval.client import Client
-from pyserval.exceptions import DuplicateBundleException
+from pyserval.exceptions import (
+    DecryptionError,
+    DuplicateBundleException,
+    ManifestNotFoundError,
+)
+from pyserval.keyring import Keyring
+from pyserval.lowlevel.connection import RestfulConnection
+from pyserval.lowlevel.keyring import LowLevelKeyring
+from pyserval.lowlevel.rhizome import LowLevelRhizome, Manifest
+from pyserval.rhizome import Bundle, Journal, Rhizome
 
-from hypothesis import given
+from hypothesis import given, reject
 
 from tests.custom_strategies import (
     unicode_printable,
@@ -12,6 +24,7 @@ from tests.custom_strategies import (
     payloads_nonempty,
     custom_fields,
 )
+from tests.stubs import StubLowLevelRhizome
 
 
 # if we try to create a bundle which is a 'duplicate' of an existing bundle, it will cause an exception
@@ -19,6 +32,25 @@ from tests.custom_strategies import (
 created_bundles = []
 
 
+def new_bundle_unless_duplicate(rhizome, **parameters):
+    """Creates a new bundle, discarding the example if it is a duplicate of an existing one
+
+    Hypothesis may generate the same parameters more than once,
+    but serval refuses to store an identical bundle again
+
+    Args:
+        rhizome (Rhizome): Interface of the test client
+        parameters: Parameters for Rhizome.new_bundle
+
+    Returns:
+        Bundle: The new bundle
+    """
+    try:
+        return rhizome.new_bundle(**parameters)
+    except DuplicateBundleException:
+        reject()
+
+
 @given(name=unicode_printable, payload=payloads, service=ascii_alphanum)
 def test_new_bundle(serval_init, name, payload, service):
     """Test adding of new bundles
@@ -226,3 +258,252 @@ def test_new_journal(serval_init, name, payload, service):
         assert test_journal.manifest.service == "file"
     else:
         assert test_journal.manifest.service == service
+
+
+@given(name=unicode_printable, payload=payloads, service=ascii_alphanum)
+def test_iter_payload(serval_init, name, payload, service):
+    """Test streaming of a bundle's payload
+
+    Args:
+        serval_init (Client): Serval client created by test init
+        name (str): Semi-random test names created by hypothesis
+        payload (bytes): Random bytes for test payload
+        service (str): Semi-random service name
+    """
+    rhizome = serval_init.rhizome
+    new_bundle = new_bundle_unless_duplicate(
+        rhizome, name=name, payload=payload, service=service
+    )
+
+    chunks = list(rhizome.iter_payload(new_bundle, chunk_size=16))
+
+    assert all(len(chunk) <= 16 for chunk in chunks)
+    assert b"".join(chunks) == payload
+
+
+@given(name=unicode_printable, payload=payloads, service=ascii_alphanum)
+def test_get_bundles(serval_init, name, payload, service):
+    """Test concurrent retrieval of multiple bundles
+
+    Args:
+        serval_init (Client): Serval client created by test init
+        name (str): Semi-random test names created by hypothesis
+        payload (bytes): Random bytes for test payload
+        service (str): Semi-random service name
+    """
+    rhizome = serval_init.rhizome
+    new_bundle = new_bundle_unless_duplicate(
+        rhizome, name=name, payload=payload, service=service
+    )
+
+    bids = [new_bundle.bundle_id, new_bundle.bundle_id]
+
+    manifests_only = rhizome.get_bundles(bids)
+    assert [bundle.bundle_id for bundle in manifests_only] == bids
+    assert not any(bundle.complete for bundle in manifests_only)
+
+    complete = rhizome.get_bundles(bids, include_payload=True)
+    assert all(bundle.payload == payload for bundle in complete)
+    assert complete[0] == rhizome.get_bundle(new_bundle.bundle_id)
+
+
+def stub_rhizome():
+    """Creates a Rhizome-interface which is served by StubLowLevelRhizome
+
+    Returns:
+        Tuple[Rhizome, StubLowLevelRhizome]: The interface and its low level stub
+    """
+    low_level = StubLowLevelRhizome()
+    keyring = Keyring(LowLevelKeyring(RestfulConnection()))
+    return Rhizome(low_level, keyring), low_level
+
+
+def manifest_text(bid, version, **fields):
+    """Creates the text of a minimal manifest
+
+    Args:
+        bid (str): Bundle ID
+        version (int): Bundle version
+        fields: Additional manifest fields
+
+    Returns:
+        str: Manifest in text+binarysig format
+    """
+    lines = [f"id={bid}", f"version={version}", "service=file"]
+    lines.extend(f"{key}={value}" for key, value in fields.items())
+    return "\n".join(lines) + "\n\0signature"
+
+
+def test_get_payload_cached_by_received_version():
+    rhizome, low_level = stub_rhizome()
+    low_level.payloads["A"] = (2, "HASH-2", b"version 2")
+    outdated = Bundle(
+        rhizome, Manifest(id="A", version=1, filehash="HASH-1"), bundle_id="A"
+    )
+
+    # the server sends its current version, which must not be cached for the old one
+    assert rhizome.get_payload(outdated) == b"version 2"
+    low_level.payloads["A"] = (1, "HASH-1", b"version 1")
+    assert rhizome.get_payload(outdated) == b"version 1"
+    assert rhizome.get_payload(outdated) == b"version 1"
+
+    current = Bundle(
+        rhizome, Manifest(id="A", version=2, filehash="HASH-2"), bundle_id="A"
+    )
+    assert rhizome.get_payload(current) == b"version 2"
+    assert [request[0] for request in low_level.requests] == ["raw", "raw"]
+
+
+def test_get_payload_same_version_new_filehash():
+    rhizome, low_level = stub_rhizome()
+    low_level.payloads["A"] = (1, "HASH-1", b"journal")
+    journal = Journal(
+        rhizome, Manifest(id="A", version=1, filehash="HASH-1"), bundle_id="A"
+    )
+    assert rhizome.get_payload(journal) == b"journal"
+
+    # e.g. after the start of a journal's payload has been dropped
+    low_level.payloads["A"] = (1, "HASH-2", b"nal")
+    journal.manifest.update_manual(filehash="HASH-2")
+    assert rhizome.get_payload(journal) == b"nal"
+
+
+def test_get_payload_without_filehash_not_cached():
+    rhizome, low_level = stub_rhizome()
+    low_level.payloads["A"] = (1, None, b"payload")
+    bundle = Bundle(rhizome, Manifest(id="A", version=1), bundle_id="A")
+
+    assert rhizome.get_payload(bundle) == b"payload"
+    assert rhizome.get_payload(bundle) == b"payload"
+    assert [request[0] for request in low_level.requests] == ["raw", "raw"]
+
+
+def encrypted_bundle(low_level):
+    """Stores an encrypted bundle in the stub
+
+    Args:
+        low_level (StubLowLevelRhizome): Stub to store the bundle in
+    """
+    low_level.manifests["A"] = manifest_text("A", 1, filehash="HASH", crypt=1)
+    low_level.payloads["A"] = (1, "HASH", b"ciphertext")
+    low_level.decrypted["A"] = b"plaintext"
+
+
+def test_get_payload_bundlelist_then_get_bundle():
+    rhizome, low_level = stub_rhizome()
+    encrypted_bundle(low_level)
+
+    # the bundlelist has no crypt-column, so its bundles fetch the raw payload
+    (listed,) = rhizome.get_bundlelist()
+    assert listed.manifest.crypt is None
+    assert listed.get_payload() == b"ciphertext"
+
+    # the cached ciphertext must not be returned for a decrypting request
+    assert rhizome.get_bundle("A").payload == b"plaintext"
+    assert listed.get_payload() == b"ciphertext"
+    assert rhizome.get_bundle("A").payload == b"plaintext"
+    assert [r[0] for r in low_level.requests if r[0] in ("raw", "decrypted")] == [
+        "raw",
+        "decrypted",
+    ]
+
+
+def test_get_payload_get_bundle_then_bundlelist():
+    rhizome, low_level = stub_rhizome()
+    encrypted_bundle(low_level)
+
+    assert rhizome.get_bundle("A").payload == b"plaintext"
+
+    # the cached plaintext must not be returned for a raw request
+    (listed,) = rhizome.get_bundlelist()
+    assert listed.get_payload() == b"ciphertext"
+
+
+def test_get_payload_decryption_error_not_masked():
+    rhizome, low_level = stub_rhizome()
+    encrypted_bundle(low_level)
+    (listed,) = rhizome.get_bundlelist()
+    listed.get_payload()
+
+    # without the key, decrypted.bin fails, even though the raw payload is cached
+    del low_level.decrypted["A"]
+    with pytest.raises(DecryptionError):
+        rhizome.get_bundle("A")
+
+
+def test_get_manifest_not_modified():
+    rhizome, low_level = stub_rhizome()
+    low_level.manifests["A"] = manifest_text("A", 1)
+
+    first = rhizome._get_manifest("A")
+    second = rhizome._get_manifest("A")
+
+    assert low_level.etags == [None, low_level.etag("A")]
+    assert second.version == 1
+    # the caller gets a copy, so modifying it does not alter the cache
+    assert second is not first
+    second.update_manual(version=2)
+    assert rhizome._get_manifest("A").version == 1
+
+
+def test_get_manifest_modified():
+    rhizome, low_level = stub_rhizome()
+    low_level.manifests["A"] = manifest_text("A", 1)
+    rhizome._get_manifest("A")
+
+    low_level.manifests["A"] = manifest_text("A", 2)
+
+    assert rhizome._get_manifest("A").version == 2
+    assert rhizome._get_manifest("A").version == 2
+    assert low_level.etags[-1] == low_level.etag("A")
+
+
+def test_get_manifest_lru_eviction(monkeypatch):
+    monkeypatch.setattr(pyserval.rhizome, "MANIFEST_CACHE_ENTRIES", 2)
+    rhizome, low_level = stub_rhizome()
+    for bid in "ABC":
+        low_level.manifests[bid] = manifest_text(bid, 1)
+
+    rhizome._get_manifest("A")
+    rhizome._get_manifest("B")
+    # using A makes B the least recently used entry
+    rhizome._get_manifest("A")
+    rhizome._get_manifest("C")
+
+    assert list(rhizome._manifest_cache) == ["A", "C"]
+
+    low_level.etags.clear()
+    rhizome._get_manifest("C")
+    rhizome._get_manifest("B")
+    assert low_level.etags == [low_level.etag("C"), None]
+
+
+def test_get_manifest_not_found_evicts():
+    rhizome, low_level = stub_rhizome()
+    low_level.manifests["A"] = manifest_text("A", 1)
+    rhizome._get_manifest("A")
+
+    del low_level.manifests["A"]
+    with pytest.raises(ManifestNotFoundError):
+        rhizome._get_manifest("A")
+    assert "A" not in rhizome._manifest_cache
+
+    # a re-inserted bundle is fetched unconditionally, even if it has the same ETag
+    low_level.manifests["A"] = manifest_text("A", 1)
+    assert rhizome._get_manifest("A").version == 1
+    assert low_level.etags[-1] is None
+
+
+def test_format_params_custom_field_named_header():
+    # custom fields are stored as attributes, but must not shadow the serialisation
+    manifest = Manifest(service="file", header="value")
+    params = LowLevelRhizome._format_params(manifest)
+
+    assert params[0] == (
+        "manifest",
+        (
+            "manifest1",
+            b"service=file\nheader=value\n",
+            'rhizome/manifest;format="text+binarysig"',
+        ),
+    )
@@ -0,0 +1,325 @@
+"""Tests for pyserval.lowlevel.util"""
+import gzip
+import io
+import json
+
+import pytest
+from hypothesis import given
+from hypothesis.strategies import integers, lists, one_of, text
+from requests.models import Response
+from urllib3.response import HTTPResponse
+
+from pyserval.lowlevel.util import (
+    _row_factory,
+    iter_received,
+    stream_json_rows,
+    stream_unmarshall,
+    unmarshall,
+)
+from tests.custom_strategies import unicode_printable
+
+HEADER = ["id", "name", "size"]
+
+ROWS = [
+    ["A1", "plain", 1],
+    ["B2", 'contains ] and , and " and [', 2],
+    ["C3", "multi-byte: äöü ✓ 🙂", 3],
+    ["D4", None, 4],
+]
+
+# the same formatting as serval's JSON-tables (including the line-breaks between rows)
+BODY = (
+    '{\n"header":'
+    + json.dumps(HEADER)
+    + ',\n"rows":[\n'
+    + ",\n".join(json.dumps(row, ensure_ascii=False) for row in ROWS)
+    + "\n]\n}\n"
+).encode("utf-8")
+
+cells = one_of(unicode_printable, integers())
+
+
+def split_at(data, offsets):
+    """Splits data into chunks at the given offsets
+
+    Args:
+        data (bytes): Data to be split
+        offsets (List[int]): Positions where a new chunk begins
+
+    Returns:
+        List[bytes]: Chunks of data (including empty ones)
+    """
+    bounds = [0] + sorted(offsets) + [len(data)]
+    return [data[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def decode_all(chunks):
+    """Collects all rows of a streamed table
+
+    Args:
+        chunks (Iterable[bytes]): Raw body of the table
+
+    Returns:
+        List[List[Any]]: Decoded rows
+    """
+    return [row for _, row in stream_json_rows(chunks)]
+
+
+def make_response(body, headers=None):
+    """Creates a streamed response which reads its body from memory
+
+    Args:
+        body (bytes): (Encoded) body of the response
+        headers (dict): HTTP-headers of the response
+
+    Returns:
+        requests.models.Response: Response, as if requested with 'stream=True'
+    """
+    response = Response()
+    response.status_code = 200
+    # like requests' HTTPAdapter, which leaves decoding to the reading side
+    response.raw = HTTPResponse(
+        body=io.BytesIO(body),
+        headers=headers or {},
+        preload_content=False,
+        decode_content=False,
+    )
+    return response
+
+
+def test_stream_json_rows_whole_body():
+    rows = list(stream_json_rows([BODY]))
+
+    assert [row for _, row in rows] == ROWS
+    assert all(header == HEADER for header, _ in rows)
+
+
+@pytest.mark.parametrize("offset", range(len(BODY) + 1))
+def test_stream_json_rows_split_at_every_offset(offset):
+    assert decode_all(split_at(BODY, [offset])) == ROWS
+
+
+def test_stream_json_rows_single_bytes():
+    # every multi-byte character is split across chunks
+    assert decode_all(BODY[i : i + 1] for i in range(len(BODY))) == ROWS
+
+
+@given(
+    rows=lists(lists(cells, min_size=3, max_size=3)),
+    offsets=lists(integers(min_value=0)),
+)
+def test_stream_json_rows_arbitrary_chunks(rows, offsets):
+    """Any table is decoded completely, regardless of how it is split
+
+    Args:
+        rows (List[List[Any]]): Rows of the table
+        offsets (List[int]): Positions where the body is split
+    """
+    body = json.dumps({"header": HEADER, "rows": rows}, ensure_ascii=False).encode(
+        "utf-8"
+    )
+    offsets = [offset % (len(body) + 1) for offset in offsets]
+
+    assert decode_all(split_at(body, offsets)) == rows
+
+
+@given(value=text())
+def test_stream_json_rows_string_contents(value):
+    """Strings may contain anything, including JSON-syntax and escaped characters
+
+    Args:
+        value (str): Content of the only column
+    """
+    body = json.dumps({"header": ["value"], "rows": [[value], [value]]}).encode("utf-8")
+
+    assert decode_all(body[i : i + 1] for i in range(len(body))) == [[value], [value]]
+
+
+def test_stream_json_rows_empty_table():
+    body = b'{"header":["id","name"],"rows":[]}'
+
+    assert decode_all([body]) == []
+    assert decode_all(body[i : i + 1] for i in range(len(body))) == []
+
+
+def test_stream_json_rows_stops_at_end_of_table():
+    # anything after the table (e.g. a second one) is ignored
+    body = BODY + b'{"header":["x"],"rows":[["y"]]}'
+
+    assert decode_all([body]) == ROWS
+
+
+@pytest.mark.parametrize("offset", range(len(BODY)))
+def test_stream_json_rows_truncated(offset):
+    """A body which ends early yields every complete row, but no partial one
+
+    Args:
+        offset (int): Length of the truncated body
+    """
+    truncated = BODY[:offset]
+    rows = decode_all([truncated])
+
+    assert rows == ROWS[: len(rows)]
+    for row in ROWS[len(rows) :]:
+        # a row which has not been yielded was not received completely
+        assert json.dumps(row, ensure_ascii=False).encode("utf-8") not in truncated
+
+
+def test_iter_received():
+    response = make_response(BODY)
+    chunks = list(iter_received(response, chunk_size=16))
+
+    assert b"".join(chunks) == BODY
+    assert all(0 < len(chunk) <= 16 for chunk in chunks)
+
+
+def test_iter_received_gzip():
+    response = make_response(gzip.compress(BODY), {"Content-Encoding": "gzip"})
+
+    assert b"".join(iter_received(response, chunk_size=16)) == BODY
+
+
+def test_iter_received_without_read1():
+    """The fallback for urllib3 < 2.0 reads with the requested chunk size"""
+
+    class OldRaw:
+        def __init__(self, body):
+            self._body = io.BytesIO(body)
+            self.amounts = []
+
+        def stream(self, amt, decode_content=None):
+            self.amounts.append(amt)
+            while True:
+                data = self._body.read(amt)
+                if not data:
+                    return
+                yield data
+
+    response = Response()
+    response.status_code = 200
+    response.raw = OldRaw(BODY)
+
+    assert b"".join(iter_received(response, chunk_size=16)) == BODY
+    assert response.raw.amounts == [16]
+
+
+class RecordingType(type):
+    """Metaclass which records how the constructor of its classes is called"""
+
+    def __call__(cls, *args, **kwargs):
+        cls.calls.append((args, kwargs))
+        return super().__call__(*args, **kwargs)
+
+
+class Record(metaclass=RecordingType):
+    calls = []
+
+    def __init__(self, a, b=None, c=None, **extra):
+        self.values = dict(a=a, b=b, c=c, **extra)
+
+
+class Strict:
+    def __init__(self, a, b):
+        self.values = dict(a=a, b=b)
+
+
+def build_one(header, row, **kwargs):
+    """Builds a Record from a single row with a generated factory
+
+    Args:
+        header (Tuple[str, ...]): Header of the table
+        row (List[Any]): Values of the row
+        kwargs: Additional constructor parameters
+
+    Returns:
+        Tuple[tuple, dict]: Positional and keyword arguments passed to the constructor
+    """
+    Record.calls.clear()
+    build = _row_factory(Record, header, frozenset(kwargs))
+    build(row, kwargs)
+    return Record.calls[-1]
+
+
+def test_row_factory_positional_then_keyword():
+    # leading constructor-parameters are passed positionally, in the constructor's order
+    args, kwargs = build_one(("b", "x", "a", "c"), [2, "x", 1, 3])
+
+    assert args == (1, 2, 3)
+    assert kwargs == {"x": "x"}
+
+
+def test_row_factory_keyword_after_missing_parameter():
+    # 'b' is missing, so everything after 'a' has to be passed by keyword
+    args, kwargs = build_one(("c", "a"), [3, 1])
+
+    assert args == (1,)
+    assert kwargs == {"c": 3}
+
+
+def test_row_factory_kwargs_override_columns():
+    args, kwargs = build_one(("a", "b", "c", "x"), [1, 2, 3, "x"], c="kw", x="kw")
+
+    assert args == (1, 2, "kw")
+    assert kwargs == {"x": "kw"}
+
+
+@pytest.mark.parametrize(
+    "header",
+    [("a", "b", "a"), ("a", "b", "bundle-id"), ("a", "b", "class"), ("a", "b", "1x")],
+)
+def test_row_factory_falls_back(header):
+    """Columns which can't be generated as keyword-arguments fall back to the dict-path
+
+    Args:
+        header (Tuple[str, ...]): Header with a duplicate or non-identifier column
+    """
+    assert _row_factory(Record, header, frozenset()) is None
+
+    table = {"header": list(header), "rows": [[1, 2, 3]]}
+    expected = dict(zip(header, [1, 2, 3]))
+    expected.setdefault("c", None)
+
+    assert [record.values for record in unmarshall(table, Record)] == [expected]
+    assert [
+        record.values
+        for record in stream_unmarshall([json.dumps(table).encode()], Record)
+    ] == [expected]
+
+
+def test_row_factory_fallback_kwargs_override_columns():
+    table = {"header": ["a", "b", "bundle-id"], "rows": [[1, 2, 3]]}
+    (record,) = unmarshall(table, Record, b="kw")
+
+    assert record.values == {"a": 1, "b": "kw", "c": None, "bundle-id": 3}
+
+
+def test_row_factory_extra_columns():
+    # columns which the class does not accept are an error, like with the dict-path
+    table = {"header": ["a", "b", "extra"], "rows": [[1, 2, 3]]}
+
+    with pytest.raises(TypeError):
+        unmarshall(table, Strict)
+    with pytest.raises(TypeError):
+        list(stream_unmarshall([json.dumps(table).encode()], Strict))
+
+    # unless they are matched by a catch-all parameter
+    (record,) = unmarshall(table, Record)
+    assert record.values == {"a": 1, "b": 2, "c": None, "extra": 3}
+
+
+@given(values=lists(integers(), min_size=2, max_size=2), extra=integers())
+def test_unmarshall_matches_dict_path(values, extra):
+    """The generated factories create the same objects as the generic path
+
+    Args:
+        values (List[int]): Values of the columns 'b' and 'a'
+        extra (int): Value of an additional keyword-argument
+    """
+    header = ["b", "a", "x"]
+    row = values + ["x"]
+    table = {"header": header, "rows": [row]}
+
+    (record,) = unmarshall(table, Record, extra=extra)
+    expected = Record(**dict(zip(header, row), extra=extra))
+
+    assert record.values == expected.values